@@ -0,0 +1,61 @@
+"""Warm read latency of Config against spec size and source spec layers.
+
+Reads should stay flat as parameters and layered source specs are added.
+
+Usage:
+    python benchmarks/config_read.py
+"""
+from pathlib import Path
+import sys
+import timeit
+
+# Add repo root to path to make config_composer importable
+repo_root = str(Path(__file__).absolute().parent.parent)
+sys.path.append(repo_root)
+from config_composer.core import Config, Spec  # noqa: E402
+from config_composer.sources import Default  # noqa: E402
+
+PARAMETER_COUNTS = (1, 10, 100, 1000)
+LAYER_COUNTS = (1, 5, 20)
+NUMBER = 20000
+
+
+def make_config(parameters, layers):
+    names = [f"param_{i}" for i in range(parameters)]
+    config_spec = type(
+        "ConfigSpec", (Spec,), {"__annotations__": dict((n, str) for n in names)}
+    )
+    source_specs = tuple(
+        type(f"SourceSpec{layer}", (), dict((n, Default(n)) for n in names))
+        for layer in range(layers)
+    )
+    return Config(config_spec=config_spec, source_spec=source_specs), names
+
+
+def time_read(read):
+    best = min(timeit.Timer(read).repeat(repeat=5, number=NUMBER))
+    return best / NUMBER * 1e9
+
+
+def bench_read(parameters, layers):
+    config, names = make_config(parameters, layers)
+    name = names[-1]
+    snapshot = config.snapshot()
+    return (
+        time_read(lambda: getattr(config, name)),
+        time_read(lambda: getattr(snapshot, name)),
+    )
+
+
+def main():
+    print(f"{'parameters':>10} | {'layers':>6} | {'ns/read':>8} | {'snapshot':>8}")
+    for parameters in PARAMETER_COUNTS:
+        for layers in LAYER_COUNTS:
+            ns, snapshot_ns = bench_read(parameters, layers)
+            print(
+                f"{parameters:>10} | {layers:>6} | {ns:>8.0f} | {snapshot_ns:>8.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Backend requests per cache key when many threads miss at once.
+
+Every key should reach the backend exactly once, however many threads read
+it concurrently. Sources fetching their siblings in batches, aws.Parameter
+from SSM (moto), should make a single round of batched calls.
+
+Usage:
+    python benchmarks/single_flight.py
+"""
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import sys
+import threading
+import time
+
+# Add repo root to path to make config_composer importable
+repo_root = str(Path(__file__).absolute().parent.parent)
+sys.path.append(repo_root)
+from benchmarks.standins import ssm_standin  # noqa: E402
+from config_composer.sources import aws  # noqa: E402
+from config_composer.sources.abc import (  # noqa: E402
+    AbstractSourceDescriptor,
+    ValueSource,
+)
+
+THREADS = 64
+KEYS = 16
+LATENCY = 0.05
+PARAMETERS = 30
+
+requests: Counter = Counter()
+
+
+class SlowBackend(ValueSource, AbstractSourceDescriptor):
+    def __init__(self, path):
+        self._path = path
+
+    @property
+    def _name(self):
+        return self._path
+
+    @property
+    def _key(self):
+        return (type(self).__name__,)
+
+    def __repr__(self):
+        return f"""SlowBackend(path="{self._path}")"""
+
+    @property
+    def _value(self):
+        requests[self._path] += 1
+        time.sleep(LATENCY)
+        return self._path
+
+
+def read_concurrently(sources, SourceSpec):
+    """Reads every source from each thread, starting at different sources.
+
+    Returns the seconds taken.
+    """
+    barrier = threading.Barrier(THREADS)
+
+    def read(thread):
+        barrier.wait()
+        start = thread % len(sources)
+        for source in sources[start:] + sources[:start]:
+            source.__get__(None, SourceSpec)
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        list(executor.map(read, range(THREADS)))
+    return time.monotonic() - start
+
+
+def value_source():
+    sources = [SlowBackend(f"key_{i}") for i in range(KEYS)]
+    elapsed = read_concurrently(sources, type("SourceSpec", (), {}))
+
+    print(f"threads={THREADS} keys={KEYS} elapsed={elapsed:.3f}s")
+    print(f"backend requests per key: {sorted(set(requests.values()))}")
+    assert all(count == 1 for count in requests.values()), requests
+
+
+def batching_source():
+    names = [f"/bench/{i}" for i in range(PARAMETERS)]
+    with ssm_standin(dict((name, name) for name in names), LATENCY) as session:
+        calls = Counter()
+        session.events.register(
+            "before-call.ssm.*", lambda model, **kwargs: calls.update([model.name])
+        )
+        sources = [aws.Parameter(path=name, session=session) for name in names]
+        SourceSpec = type(
+            "SourceSpec", (), dict((f"param_{i}", s) for i, s in enumerate(sources))
+        )
+        elapsed = read_concurrently(sources, SourceSpec)
+
+    batches = -(-PARAMETERS // aws.GET_PARAMETERS_BATCH_SIZE)
+    print(f"threads={THREADS} parameters={PARAMETERS} elapsed={elapsed:.3f}s")
+    print(f"SSM calls: {dict(calls)}, batches: {batches}")
+    assert calls == Counter(GetParameters=batches), calls
+
+
+def main():
+    value_source()
+    batching_source()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Local stand-ins for the remote backends used by the benchmarks.
+
+SSM is served by moto, Vault by a small HTTP server implementing the parts
+of the KV API read by vault.Secret. Both add a fixed latency to every
+request, to stand in for the network round trip. The Vault stand-in can
+also fail requests, to stand in for an unhealthy server.
+"""
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+
+try:
+    from moto import mock_aws
+except ImportError:
+    # moto < 5
+    from moto import mock_ssm as mock_aws
+
+REGION = "us-east-1"
+
+
+@contextmanager
+def ssm_standin(parameters, latency=0.0):
+    """Serves parameters, a dict of name -> value, from a mocked SSM.
+
+    Yields a boto3 session whose clients wait latency seconds per call.
+    """
+    import boto3.session
+
+    with mock_aws():
+        session = boto3.session.Session(
+            aws_access_key_id="testing",
+            aws_secret_access_key="testing",
+            region_name=REGION,
+        )
+        client = session.client("ssm", region_name=REGION)
+        for name, value in parameters.items():
+            client.put_parameter(Name=name, Value=value, Type="String")
+        if latency:
+            session.events.register(
+                "before-call.ssm.*", lambda **kwargs: time.sleep(latency)
+            )
+        yield session
+
+
+class VaultStandIn:
+    """Vault KV v2 API serving secrets, a dict of path -> fields.
+
+    :param secrets: secret data, keyed by path under the "secret" mount
+    :param latency: seconds to wait before answering each request
+    """
+
+    def __init__(self, secrets, latency=0.0):
+        self.secrets = secrets
+        self.latency = latency
+        self.requests = 0
+        # Number of upcoming requests to fail, and their status
+        self.failures = 0
+        self.failure_status = 503
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                standin.requests += 1
+                time.sleep(standin.latency)
+                status, body = standin.respond(self.path.split("?")[0])
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def fail(self, count, status=503):
+        """Fails the next count requests with status."""
+        self.failures = count
+        self.failure_status = status
+
+    def respond(self, path):
+        if self.failures:
+            self.failures -= 1
+            return self.failure_status, {"errors": ["stand-in failure"]}
+        if path == "/v1/sys/mounts":
+            mount = {"options": {"version": "2"}, "type": "kv"}
+            return 200, {"secret/": mount, "data": {"secret/": mount}}
+        prefix = "/v1/secret/data/"
+        if path.startswith(prefix) and path[len(prefix) :] in self.secrets:
+            data = self.secrets[path[len(prefix) :]]
+            return 200, {"data": {"data": data, "metadata": {"version": 1}}}
+        return 404, {"errors": []}
+
+    def __enter__(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="vault-standin", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,312 @@
+"""Benchmark suite, writing results as JSON to compare between commits.
+
+Measures:
+- warm read latency of Config attribute, item and get() access
+- cold preload time against spec size, from SSM (moto) and a Vault stand-in
+- DotEnvFile refresh cost against file size, when changed and unchanged
+- memory per parameter of a loaded Config
+
+Remote backends run locally, see benchmarks/standins.py, and answer after
+a configurable latency.
+
+Usage:
+    python benchmarks/suite.py [--output results.json] [--latency 0.005] [--quick]
+
+Compare two runs with:
+    python benchmarks/suite.py --compare before.json after.json
+"""
+from pathlib import Path
+from statistics import median
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import timeit
+import tracemalloc
+
+# Add repo root to path to make config_composer importable
+repo_root = str(Path(__file__).absolute().parent.parent)
+sys.path.append(repo_root)
+from benchmarks.standins import VaultStandIn, ssm_standin  # noqa: E402
+from config_composer.core import Config, Spec  # noqa: E402
+from config_composer.core.utils import preload  # noqa: E402
+from config_composer.sources import Default, aws, files, vault  # noqa: E402
+
+LATENCY = 0.005
+READ_NUMBER = 20000
+REPEAT = 5
+# Number of fields per Vault secret
+SECRET_FIELDS = 10
+
+SPEC_SIZES = (10, 100, 500)
+FILE_SIZES = (10, 100, 1000, 10000)
+MEMORY_SIZES = (100, 1000, 10000)
+
+QUICK_SPEC_SIZES = (10, 50)
+QUICK_FILE_SIZES = (10, 1000)
+QUICK_MEMORY_SIZES = (100, 1000)
+
+
+def config_spec(names):
+    return type(
+        "ConfigSpec", (Spec,), {"__annotations__": dict((n, str) for n in names)}
+    )
+
+
+def remote_spec(size, session, server):
+    """Source spec of size parameters, half from SSM and half from Vault.
+
+    A new class each time, so that its sources start with an empty cache.
+    """
+    sources = {}
+    for i in range(size):
+        name = f"param_{i}"
+        if i % 2:
+            sources[name] = aws.Parameter(
+                f"/bench/{name}", region=session.region_name, session=session
+            )
+        else:
+            secret = f"bench/{i // (2 * SECRET_FIELDS)}"
+            sources[name] = vault.Secret(path=secret, field=name, server=server)
+    return type("SourceSpec", (), sources)
+
+
+def remote_data(size):
+    parameters = {}
+    secrets: dict = {}
+    for i in range(size):
+        name = f"param_{i}"
+        if i % 2:
+            parameters[f"/bench/{name}"] = f"value_{i}"
+        else:
+            secret = f"bench/{i // (2 * SECRET_FIELDS)}"
+            secrets.setdefault(secret, {})[name] = f"value_{i}"
+    return parameters, secrets
+
+
+def time_per_call(func, number):
+    """Best of REPEAT runs, in nanoseconds per call."""
+    best = min(timeit.Timer(func).repeat(repeat=REPEAT, number=number))
+    return best / number * 1e9
+
+
+def bench_warm_reads(sizes, latency):
+    """Latency of reads served from the source caches."""
+    results = []
+    for size in sizes:
+        parameters, secrets = remote_data(size)
+        names = [f"param_{i}" for i in range(size)]
+        with ssm_standin(parameters, latency) as session, VaultStandIn(
+            secrets, latency
+        ) as server:
+            config = Config(
+                config_spec=config_spec(names),
+                source_spec=remote_spec(size, session, server.url),
+            )
+            preload(config)
+            # Last parameters are read from each backend
+            for name in names[-2:]:
+                source = type(config._plan(name).sources[0]).__name__
+                results.append(
+                    {
+                        "parameters": size,
+                        "source": source,
+                        "getattr_ns": time_per_call(
+                            lambda: getattr(config, name), READ_NUMBER
+                        ),
+                        "getitem_ns": time_per_call(lambda: config[name], READ_NUMBER),
+                        "get_ns": time_per_call(lambda: config.get(name), READ_NUMBER),
+                    }
+                )
+    return results
+
+
+def bench_cold_preload(sizes, latency):
+    """Time to preload a config whose sources have nothing cached."""
+    results = []
+    for size in sizes:
+        parameters, secrets = remote_data(size)
+        names = [f"param_{i}" for i in range(size)]
+        with ssm_standin(parameters, latency) as session, VaultStandIn(
+            secrets, latency
+        ) as server:
+            timings = []
+            requests = []
+            for _ in range(REPEAT):
+                config = Config(
+                    config_spec=config_spec(names),
+                    source_spec=remote_spec(size, session, server.url),
+                )
+                before = server.requests
+                start = timeit.default_timer()
+                preload(config)
+                timings.append(timeit.default_timer() - start)
+                requests.append(server.requests - before)
+        results.append(
+            {
+                "parameters": size,
+                "latency_s": latency,
+                "best_s": min(timings),
+                "median_s": median(timings),
+                "vault_requests": median(requests),
+            }
+        )
+    return results
+
+
+def write_envfile(path, lines):
+    with open(path, "w") as f:
+        for i in range(lines):
+            f.write(f"KEY_{i}=value_{i}\n")
+
+
+def bench_dotenv_refresh(sizes):
+    """Cost of refreshing a DotEnvFile, reparsed or skipped when unchanged."""
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            dotenv_path = os.path.join(directory, f"{size}.env")
+            write_envfile(dotenv_path, size)
+            source = files.DotEnvFile(path="KEY_0", dotenv_path=dotenv_path, ttl=0)
+            SourceSpec = type("SourceSpec", (), {"KEY_0": source})
+            source.__get__(None, SourceSpec)
+
+            number = max(1, 20000 // size)
+            stat = os.stat(dotenv_path)
+            mtime = [stat.st_mtime_ns]
+
+            def changed():
+                # A new mtime is enough for the file to be reparsed
+                mtime[0] += 1
+                os.utime(dotenv_path, ns=(mtime[0], mtime[0]))
+                source._refresh(None, SourceSpec)
+
+            def touch():
+                mtime[0] += 1
+                os.utime(dotenv_path, ns=(mtime[0], mtime[0]))
+
+            touch_ns = time_per_call(touch, number)
+            results.append(
+                {
+                    "lines": size,
+                    "bytes": stat.st_size,
+                    "changed_us": (time_per_call(changed, number) - touch_ns) / 1e3,
+                    "unchanged_us": time_per_call(
+                        lambda: source._refresh(None, SourceSpec), number
+                    )
+                    / 1e3,
+                }
+            )
+    return results
+
+
+def bench_memory(sizes):
+    """Memory allocated per parameter by a config with every value loaded."""
+    results = []
+    for size in sizes:
+        names = [f"param_{i}" for i in range(size)]
+        spec = config_spec(names)
+        values = [f"value_{i}" for i in range(size)]
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        source_spec = type(
+            "SourceSpec",
+            (),
+            dict((name, Default(value)) for name, value in zip(names, values)),
+        )
+        config = Config(config_spec=spec, source_spec=source_spec)
+        for name in names:
+            config[name]
+        snapshot = config.snapshot()
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        results.append(
+            {"parameters": size, "bytes_per_parameter": (after - before) / size}
+        )
+        del config, snapshot
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=repo_root,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(latency, quick):
+    spec_sizes = QUICK_SPEC_SIZES if quick else SPEC_SIZES
+    file_sizes = QUICK_FILE_SIZES if quick else FILE_SIZES
+    memory_sizes = QUICK_MEMORY_SIZES if quick else MEMORY_SIZES
+    return {
+        "commit": git_commit(),
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": {
+            "warm_reads": bench_warm_reads(spec_sizes, latency),
+            "cold_preload": bench_cold_preload(spec_sizes, latency),
+            "dotenv_refresh": bench_dotenv_refresh(file_sizes),
+            "memory": bench_memory(memory_sizes),
+        },
+    }
+
+
+def compare(before_path, after_path):
+    """Prints the relative change of every measurement between two runs."""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"{before['commit']} -> {after['commit']}")
+    for name, rows in after["results"].items():
+        for old, new in zip(before["results"].get(name, []), rows):
+            for key, value in new.items():
+                if key.endswith(("_ns", "_us", "_s", "_parameter")) and old.get(key):
+                    change = (value - old[key]) / old[key] * 100
+                    labels = ", ".join(
+                        f"{k}={v}" for k, v in new.items() if isinstance(v, (int, str))
+                    )
+                    print(f"{name:<15} {labels:<35} {key:<20} {change:+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=LATENCY,
+        help="seconds added to every backend request",
+    )
+    parser.add_argument("--quick", action="store_true", help="smaller sizes")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = run(args.latency, args.quick)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results["results"], indent=2))
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
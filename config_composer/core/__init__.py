@@ -2,3 +2,12 @@ from ..consts import NOTHING  # noqa
 from .config import Config, ParameterError  # noqa
 from .parameter_types import String, Integer  # noqa
 from .spec import Spec  # noqa
+
+
+def __getattr__(name):
+    # AsyncConfig is imported on first use, as asyncio is slow to import
+    if name == "AsyncConfig":
+        from .aio import AsyncConfig
+
+        return AsyncConfig
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,106 @@
+from concurrent.futures import Executor
+from typing import Optional
+import asyncio
+import time
+
+from ..consts import NOTHING
+from ..core_data_structures import PreloadResult
+from ..sources.abc import AbstractAsyncSourceDescriptor
+from ..sources.aio import Offload
+from .config import Config
+from .utils import PreloadError
+
+
+class AsyncConfig(Config):
+    """A Config which can also be read from asyncio without blocking.
+
+    ``await config.aget(name)`` resolves async sources natively and runs
+    synchronous sources in an executor. Attribute and item access keep
+    working as they do on Config.
+
+    Args:
+        executor (Executor): used to offload synchronous sources. Defaults
+            to the event loop's default executor.
+    """
+
+    def __init__(self, *args, executor: Optional[Executor] = None, **kwargs):
+        self.__executor = executor
+        super().__init__(*args, **kwargs)
+
+    def _compile_plan(self):
+        plan = super()._compile_plan()
+        self.__async_sources = dict(
+            (name, tuple(self._async_source(s) for s in parameter_plan.sources))
+            for name, parameter_plan in plan.items()
+        )
+        return plan
+
+    def _async_source(self, source):
+        if isinstance(source, AbstractAsyncSourceDescriptor):
+            return source
+        if not hasattr(type(source), "__get__"):
+            # Set directly on the SourceSpec, the value itself
+            return source
+        return Offload(source, executor=self.__executor)
+
+    async def aget(self, name):
+        """
+        Retrieves a configured parameter without blocking the event loop.
+
+        Throws ParameterError when attempting to retieve a parameter
+        which is not defined on the ConfigSpec.
+        """
+        plan = self._plan(name)
+        sources = self.__async_sources[name]
+        for layer in self._layers(plan):
+            source = sources[layer]
+            if isinstance(source, AbstractAsyncSourceDescriptor):
+                source_value = await source._aget(None, self._composed_source_spec)
+            else:
+                source_value = source
+            if source_value is not NOTHING:
+                self._answered(plan, layer)
+                return self._convert(plan, source_value)
+        return NOTHING
+
+
+async def _aload(config, name):
+    start = time.monotonic()
+    try:
+        value = await config.aget(name)
+        error = "no value" if value is NOTHING else None
+    except Exception as e:
+        value, error = NOTHING, repr(e)
+    return PreloadResult(
+        name=name, value=value, elapsed=time.monotonic() - start, error=error
+    )
+
+
+async def apreload(config: AsyncConfig, timeout: Optional[float] = None):
+    """Fetches every parameter concurrently on the running event loop.
+
+    Async counterpart of ``preload``, with the same results and errors.
+    """
+    names = config._parameter_names()
+    start = time.monotonic()
+    tasks = [asyncio.ensure_future(_aload(config, name)) for name in names]
+    if tasks:
+        await asyncio.wait(tasks, timeout=timeout)
+
+    results = []
+    for name, task in zip(names, tasks):
+        if task.done():
+            results.append(task.result())
+        else:
+            task.cancel()
+            results.append(
+                PreloadResult(
+                    name=name,
+                    value=NOTHING,
+                    elapsed=time.monotonic() - start,
+                    error="timed out",
+                )
+            )
+    if any(result.error for result in results):
+        raise PreloadError(results)
+    return results
@@ -1,20 +1,30 @@
 from configparser import ConfigParser
 from pathlib import Path
+from functools import lru_cache, partial
+from importlib import import_module
 from typing import Iterable, Callable, Dict, Union, Type
 import inspect
+import json
 import logging
 import os
 
-import yaml
-
 from ..consts import NOTHING
-from ..sources.abc import AbstractSourceDescriptor
+from ..core_data_structures import ResolutionPlan
+from ..sources import LAZY_SOURCES
+from ..sources.abc import FALLBACK_COST, AbstractSourceDescriptor
+from .snapshot import snapshot_type, build_snapshot
 from .utils import all_parameter_info
 
 
-SOURCES = dict(
-    (source.__name__, source) for source in AbstractSourceDescriptor.__subclasses__()
-)
+def get_source(name):
+    """Returns the source class named in a source spec file."""
+    if name in LAZY_SOURCES:
+        import_module(f"..sources.{LAZY_SOURCES[name]}", __package__)
+    sources = dict(
+        (source.__name__, source)
+        for source in AbstractSourceDescriptor.__subclasses__()
+    )
+    return sources[name]
 
 
 logger = logging.getLogger(__name__)
@@ -24,12 +34,18 @@ class ParameterError(Exception):
     pass
 
 
+@lru_cache(maxsize=None)
+def get_source_arg_names(source: Callable):
+    """Argument names of a source callable, inspected once per source."""
+    return tuple(inspect.getfullargspec(source).args)
+
+
 def get_source_kwargs(source: Callable, data: Dict):
     """
     Filters a data dictionary and returns only key/values
     which match argument names of the source callable.
     """
-    arg_names = inspect.getfullargspec(source).args
+    arg_names = get_source_arg_names(source)
     kwargs = dict(
         (name, value)
         for name, value in ((name, data.get(name)) for name in arg_names)
@@ -50,22 +66,50 @@ def source_spec_parameters_from_ini(filepath):
 
 
 def source_spec_paramaters_from_yaml(filepath):
+    import yaml
+
     with open(filepath) as fh:
         yaml_config = yaml.safe_load(fh)
     parameters = yaml_config["parameters"]
     return parameters
 
 
+def source_spec_parameters_from_json(filepath):
+    with open(filepath) as fh:
+        json_config = json.load(fh)
+    parameters = json_config["parameters"]
+    return parameters
+
+
 FILETYPE_FACTORIES = {
     ".ini": source_spec_parameters_from_ini,
     ".yaml": source_spec_paramaters_from_yaml,
     ".yml": source_spec_paramaters_from_yaml,
+    ".json": source_spec_parameters_from_json,
 }
 
+# absolute filepath -> (file fingerprint, compiled source spec)
+_compiled_source_specs: Dict[str, tuple] = {}
 
-def source_spec_from_file(filepath):
-    class SourceSpec:
-        pass
+
+def file_fingerprint(filepath):
+    stat = os.stat(filepath)
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def compile_source_spec(filepath):
+    """
+    Parses a source spec file into (parameter name, source class, source
+    kwargs) tuples.
+
+    Compiled specs are kept for the life of the process, and the file is
+    only parsed again once it has been modified.
+    """
+    path = os.path.abspath(filepath)
+    fingerprint = file_fingerprint(path)
+    compiled = _compiled_source_specs.get(path)
+    if compiled is not None and compiled[0] == fingerprint:
+        return compiled[1]
 
     file_suffix = Path(filepath).suffix
     param_factory = FILETYPE_FACTORIES[file_suffix]
@@ -73,17 +117,66 @@ def source_spec_from_file(filepath):
         f"Creating SourceSpec from '{filepath}'' using '{file_suffix}' factory."
     )
     # TODO: handle unsupported filetypes
-    # TODO: handle missing files
     parameters = param_factory(filepath)
 
+    source_spec = []
     for s, p in parameters.items():
-        klass = SOURCES[p["source"]]
+        klass = get_source(p["source"])
         kwargs = get_source_kwargs(klass, p)
+        source_spec.append((s, klass, kwargs))
+    compiled = (fingerprint, tuple(source_spec))
+    _compiled_source_specs[path] = compiled
+    return compiled[1]
+
+
+def source_spec_from_file(filepath):
+    class SourceSpec:
+        pass
+
+    for s, klass, kwargs in compile_source_spec(filepath):
         setattr(SourceSpec, s, klass(**kwargs))
 
     return SourceSpec
 
 
+def write_compiled_source_spec(filepath, compiled_filepath):
+    """
+    Writes a source spec file as compact JSON, keeping only the arguments
+    accepted by each source.
+
+    The compiled file is itself a source spec file, which loads without
+    PyYAML and parses faster than YAML or INI.
+    """
+    parameters = dict(
+        (s, dict(kwargs, source=klass.__name__))
+        for s, klass, kwargs in compile_source_spec(filepath)
+    )
+    with open(compiled_filepath, "w") as fh:
+        json.dump(
+            {"compiled_from": os.path.abspath(filepath), "parameters": parameters},
+            fh,
+            separators=(",", ":"),
+        )
+
+
+def source_getter(source, source_spec):
+    """
+    Returns a callable which resolves the source as an attribute of the
+    source_spec would, without going through attribute lookup.
+    """
+    source_get = getattr(type(source), "__get__", None)
+    if source_get is None:
+        return lambda: source
+    return partial(source_get, source, None, source_spec)
+
+
+def source_cost(source):
+    """Relative cost of reading a source, values set directly are defaults."""
+    if not hasattr(type(source), "__get__"):
+        return FALLBACK_COST
+    return source._cost
+
+
 def get_name(obj):
     if inspect.isclass(obj):
         return obj.__name__
@@ -116,16 +209,32 @@ class Config:
     The config object:
     - only fetches configured parameters defined in ConfigSpec
     - fetches parameter values from sources defined in one of the SourceSpecs
+    - falls through the SourceSpecs, in order, until a source has a value
     - converts values into expected type defined in ConfigSpec
 
     Args:
         config_spec (Spec): ?
         source_spec (Union[Type, Iterable[Type]]): ?
         env_var: ?
+        prefer_local (bool): try cheap local sources (Env) first, then
+            files, then remote sources, whatever their SourceSpec, and
+            Default and DefaultSecret last. A local value then shadows
+            remote ones.
+        remember_layer (bool): try the source which last had a value for a
+            parameter first, before falling through the others again.
     """
 
-    def __init__(self, config_spec, source_spec=None, env_var=None):
+    def __init__(
+        self,
+        config_spec,
+        source_spec=None,
+        env_var=None,
+        prefer_local=False,
+        remember_layer=False,
+    ):
         self.__config_spec = config_spec
+        self.__prefer_local = prefer_local
+        self.__remember_layer = remember_layer
         if source_spec:
             self.__source_spec = self.source_spec_factory(source_spec)
         elif env_var:
@@ -135,6 +244,16 @@ class Config:
             )
             self.__source_spec = self.source_spec_factory(source_specs)
 
+        self.__plan = self._compile_plan()
+        # parameter name -> indices of its plan's sources, in the order tried
+        self.__layers = dict(
+            (name, tuple(range(len(plan.getters))))
+            for name, plan in self.__plan.items()
+        )
+        # parameter name -> (source value, converted value)
+        self.__converted: Dict[str, tuple] = {}
+        self.__snapshot_type = snapshot_type(config_spec)
+        self.__snapshot = None
         logger.info(format_parameter_table(all_parameter_info(self)))
 
     def source_spec_factory(self, source_spec: Union[Type, Iterable[Type]]) -> Type:
@@ -168,29 +287,95 @@ class Config:
             raise ParameterError(name)
         return sources
 
-    def __get__item__attr__(self, name):
+    def _compile_plan(self):
         """
-        Retrieves configured parameters and converts to defined type.
+        Resolves, once, the sources and type of every parameter defined
+        on both the ConfigSpec and the SourceSpec. Sources are kept in the
+        order they are tried, most significant first, or cheapest first
+        with prefer_local.
 
-        Throws ParameterError when attempting to retieve a parameter
-        which is not defined on the ConfigSpec.
+        Parameters without a source are left out of the plan and raise a
+        ParameterError when accessed.
         """
-        parameters = self.__config_spec.__parameters__
         source_spec = self.__source_spec
-        if name not in parameters:
-            raise ParameterError(name)
-        # if not hasattr(source_spec, name):
-        # Cannot use hasattr as it will invoke descriptors :facepalm:/
-        if name not in dir(source_spec):
+        plan = {}
+        for name, spec in self.__config_spec.__parameters__.items():
+            try:
+                sources = tuple(self._source_specs(name))
+            except ParameterError:
+                continue
+            if self.__prefer_local:
+                # Stable, so sources of the same cost keep their significance
+                sources = tuple(sorted(sources, key=source_cost))
+            getters = tuple(source_getter(s, source_spec) for s in sources)
+            plan[name] = ResolutionPlan(
+                name=name, type=spec.type, sources=sources, getters=getters
+            )
+        return plan
+
+    @property
+    def _composed_source_spec(self):
+        return self.__source_spec
+
+    def _plan(self, name):
+        try:
+            return self.__plan[name]
+        except KeyError:
             raise ParameterError(name)
-        spec = parameters[name]
-        source_value = getattr(source_spec, name)
+
+    def _layers(self, plan):
+        """Indices of the plan's sources, in the order they are tried."""
+        return self.__layers[plan.name]
+
+    def _answered(self, plan, layer):
+        """Records the source which had a value, to try it first next time."""
+        if not self.__remember_layer:
+            return
+        layers = self.__layers[plan.name]
+        if layers[0] != layer:
+            self.__layers[plan.name] = (layer,) + tuple(
+                other for other in layers if other != layer
+            )
+
+    def _resolve(self, plan):
+        """Value of the first source which has one, NOTHING if none has."""
+        getters = plan.getters
+        if len(getters) == 1:
+            return getters[0]()
+        for layer in self.__layers[plan.name]:
+            source_value = getters[layer]()
+            if source_value is not NOTHING:
+                self._answered(plan, layer)
+                return source_value
+        return NOTHING
+
+    def _convert(self, plan, source_value):
         # If a source returns NOTHING it's an indicator that something happened
         # and it couldn't retrieve a value.
         # In this case we return NOTHING to the user
         if source_value is NOTHING:
             return source_value
-        return spec.type(source_value)
+        # Conversion is only repeated when the source hands back a different
+        # value, i.e. its cache entry was replaced by a refresh.
+        converted = self.__converted.get(plan.name)
+        if converted is not None and converted[0] is source_value:
+            return converted[1]
+        value = plan.type(source_value)
+        self.__converted[plan.name] = (source_value, value)
+        return value
+
+    def __get__item__attr__(self, name):
+        """
+        Retrieves configured parameters and converts to defined type.
+
+        Throws ParameterError when attempting to retieve a parameter
+        which is not defined on the ConfigSpec.
+        """
+        try:
+            plan = self.__plan[name]
+        except KeyError:
+            raise ParameterError(name)
+        return self._convert(plan, self._resolve(plan))
 
     def __getattr__(self, name):
         return self.__get__item__attr__(name)
@@ -198,6 +383,30 @@ class Config:
     def __getitem__(self, name):
         return self.__get__item__attr__(name)
 
+    def snapshot(self):
+        """Returns an immutable snapshot of every parameter.
+
+        The same snapshot is returned until refresh_snapshot is called, so
+        readers keep a consistent view of the config without locking.
+        Parameters which could not be retrieved are NOTHING.
+        """
+        snapshot = self.__snapshot
+        if snapshot is None:
+            snapshot = self.refresh_snapshot()
+        return snapshot
+
+    def refresh_snapshot(self):
+        """Builds a new snapshot from current values and swaps it in."""
+        values = {}
+        for name in self.__snapshot_type._fields:
+            try:
+                values[name] = self.__get__item__attr__(name)
+            except ParameterError:
+                values[name] = NOTHING
+        snapshot = build_snapshot(self.__snapshot_type, values)
+        self.__snapshot = snapshot
+        return snapshot
+
     def get(self, name, default=None):
         try:
             value = self.__get__item__attr__(name)
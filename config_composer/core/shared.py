@@ -0,0 +1,267 @@
+"""Config values shared by a pre-fork server's master with its workers.
+
+The master process resolves every parameter once and publishes the source
+values to a memory-mapped file, with SnapshotPublisher. Workers read them
+with SharedConfig, which maps the same file, so they never fetch from the
+backends themselves:
+
+    # master, before forking workers
+    config = Config(config_spec=ConfigSpec, source_spec=SourceSpec)
+    publisher = SnapshotPublisher(config)
+    publisher.publish()
+    publisher.start(interval=30)
+
+    # worker
+    config = SharedConfig(ConfigSpec, publisher.path)
+    config.db_host
+
+Each publish bumps a generation counter in the file header. Workers check
+it on every read, and only decode the values again once it has changed.
+Writes are guarded as a seqlock: the generation is odd while the values
+are being written, and readers retry when it is odd or changed under them.
+"""
+from typing import Optional
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from ..consts import NOTHING
+from .config import ParameterError
+from .snapshot import build_snapshot, snapshot_type
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"CCSNAP1\0"
+# magic, payload length, generation
+HEADER = struct.Struct("<8sQQ")
+LENGTH = struct.Struct("<Q")
+LENGTH_OFFSET = 8
+GENERATION = struct.Struct("<Q")
+GENERATION_OFFSET = 16
+
+DEFAULT_CAPACITY = 64 * 1024
+# /dev/shm keeps the file in memory on Linux
+SHM_DIR = "/dev/shm"
+
+
+class SnapshotPublisher:
+    """Publishes the values of a config to a memory-mapped file.
+
+    :param config: Config to publish the values of.
+    :param path: of the file. Defaults to a new file in /dev/shm, or the
+        temporary directory, only readable by the current user.
+    :param capacity: initial size, in bytes, for the values. The file grows
+        when they do not fit.
+    """
+
+    def __init__(self, config, path: Optional[str] = None, capacity=DEFAULT_CAPACITY):
+        self._config = config
+        if path is None:
+            directory = SHM_DIR if os.path.isdir(SHM_DIR) else None
+            fd, path = tempfile.mkstemp(
+                prefix="config-composer-", suffix=".snapshot", dir=directory
+            )
+        else:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        self._path = path
+        self._fd = fd
+        os.ftruncate(fd, HEADER.size + capacity)
+        self._map = mmap.mmap(fd, HEADER.size + capacity)
+        HEADER.pack_into(self._map, 0, MAGIC, 0, 0)
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __repr__(self):
+        return f"""SnapshotPublisher(path="{self._path}")"""
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def _values(self):
+        """Source values, before conversion, of every parameter with one."""
+        values = {}
+        for name in self._config._parameter_names():
+            try:
+                plan = self._config._plan(name)
+            except ParameterError:
+                continue
+            value = self._config._resolve(plan)
+            if value is NOTHING:
+                continue
+            try:
+                json.dumps(value)
+            except (TypeError, ValueError):
+                logger.warning(f"Not publishing '{name}', it is not serializable.")
+                continue
+            values[name] = value
+        return values
+
+    def publish(self):
+        """Writes the current values, and returns the new generation."""
+        payload = json.dumps(self._values(), separators=(",", ":")).encode()
+        with self._lock:
+            if HEADER.size + len(payload) > len(self._map):
+                self._grow(HEADER.size + len(payload))
+            generation = self._generation + 1
+            # Odd while writing, readers wait for the write to finish
+            GENERATION.pack_into(self._map, GENERATION_OFFSET, generation)
+            self._map[HEADER.size : HEADER.size + len(payload)] = payload
+            LENGTH.pack_into(self._map, LENGTH_OFFSET, len(payload))
+            GENERATION.pack_into(self._map, GENERATION_OFFSET, generation + 1)
+            self._generation = generation + 1
+        return self._generation
+
+    def _grow(self, size):
+        # The file only ever grows, so readers' existing mappings stay valid
+        size = max(size, 2 * len(self._map))
+        os.ftruncate(self._fd, size)
+        self._map.close()
+        self._map = mmap.mmap(self._fd, size)
+
+    def start(self, interval: float):
+        """Publishes again every interval seconds, on a daemon thread."""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(interval,), name="config-publisher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, interval):
+        while not self._stopped.wait(interval):
+            try:
+                self.publish()
+            except Exception:
+                logger.exception(f"Unable to publish {self!r}.")
+
+    def close(self, unlink=True):
+        """Stops publishing, and removes the file unless unlink is False."""
+        self.stop()
+        with self._lock:
+            self._map.close()
+            os.close(self._fd)
+        if unlink:
+            os.unlink(self._path)
+
+
+class SharedConfig:
+    """Read-only config served from values published by SnapshotPublisher.
+
+    Parameters are read as on Config, and converted to the type defined on
+    the ConfigSpec. Parameters without a published value are NOTHING.
+
+    Args:
+        config_spec (Spec): same ConfigSpec as the published config.
+        path (str): of the file written by the publisher.
+    """
+
+    # Reads of a file being written are retried, sleeping after this many
+    SPIN = 100
+
+    def __init__(self, config_spec, path: str):
+        self.__config_spec = config_spec
+        self.__snapshot_type = snapshot_type(config_spec)
+        self.__path = path
+        self.__map = self._attach()
+        self.__generation: Optional[int] = None
+        self.__snapshot = None
+        self.__lock = threading.Lock()
+
+    def _attach(self):
+        fd = os.open(self.__path, os.O_RDONLY)
+        try:
+            size = os.fstat(fd).st_size
+            shared = mmap.mmap(fd, size, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+        if shared[: len(MAGIC)] != MAGIC:
+            shared.close()
+            raise ValueError(f"{self.__path} is not a published config snapshot.")
+        return shared
+
+    @property
+    def generation(self):
+        return GENERATION.unpack_from(self.__map, GENERATION_OFFSET)[0]
+
+    def _read(self):
+        """Consistent generation and payload of the values, as a seqlock."""
+        attempt = 0
+        while True:
+            attempt += 1
+            if attempt > self.SPIN:
+                time.sleep(0.001)
+            generation = GENERATION.unpack_from(self.__map, GENERATION_OFFSET)[0]
+            if generation % 2:
+                continue
+            length = LENGTH.unpack_from(self.__map, LENGTH_OFFSET)[0]
+            if HEADER.size + length > len(self.__map):
+                # The publisher has grown the file. The old mapping is left
+                # open, as other threads may still be reading it.
+                self.__map = self._attach()
+                continue
+            payload = self.__map[HEADER.size : HEADER.size + length]
+            if GENERATION.unpack_from(self.__map, GENERATION_OFFSET)[0] == generation:
+                return generation, payload
+
+    def snapshot(self):
+        """Snapshot of the values, rebuilt when a new generation is published."""
+        generation = GENERATION.unpack_from(self.__map, GENERATION_OFFSET)[0]
+        if generation != self.__generation:
+            with self.__lock:
+                self._reload()
+        return self.__snapshot
+
+    def _reload(self):
+        generation, payload = self._read()
+        if generation == self.__generation:
+            return
+        values = json.loads(payload) if payload else {}
+        parameters = self.__config_spec.__parameters__
+        converted = dict(
+            (name, parameters[name].type(values[name]) if name in values else NOTHING)
+            for name in self.__snapshot_type._fields
+        )
+        self.__snapshot = build_snapshot(self.__snapshot_type, converted)
+        self.__generation = generation
+
+    def __get__item__attr__(self, name):
+        if name not in self.__config_spec.__parameters__:
+            raise ParameterError(name)
+        return getattr(self.snapshot(), name)
+
+    def __getattr__(self, name):
+        if name.startswith("_SharedConfig__"):
+            raise AttributeError(name)
+        return self.__get__item__attr__(name)
+
+    def __getitem__(self, name):
+        return self.__get__item__attr__(name)
+
+    def get(self, name, default=None):
+        try:
+            value = self.__get__item__attr__(name)
+        except ParameterError:
+            return default
+        return default if value is NOTHING else value
+
+    def close(self):
+        self.__map.close()
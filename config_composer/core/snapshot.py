@@ -0,0 +1,39 @@
+class Snapshot:
+    """Immutable view of every parameter of a config, fully converted.
+
+    Subclasses are generated per ConfigSpec with one slot per parameter,
+    so reads are plain attribute loads.
+    """
+
+    __slots__ = ()
+    _fields: tuple = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({values})"
+
+    def _asdict(self):
+        return dict((name, getattr(self, name)) for name in self._fields)
+
+
+def snapshot_type(config_spec):
+    """Creates a Snapshot class with one slot per parameter of the spec."""
+    fields = tuple(config_spec.__parameters__)
+    return type(
+        f"{config_spec.__name__}Snapshot",
+        (Snapshot,),
+        {"__slots__": fields, "_fields": fields},
+    )
+
+
+def build_snapshot(snapshot_type, values):
+    snapshot = object.__new__(snapshot_type)
+    for name in snapshot_type._fields:
+        object.__setattr__(snapshot, name, values[name])
+    return snapshot
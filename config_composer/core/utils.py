@@ -1,6 +1,21 @@
-from ..core_data_structures import ParameterInfo
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Optional
+import time
+
+from ..core_data_structures import ParameterInfo, PreloadResult
 from ..consts import NOTHING
 
+DEFAULT_PRELOAD_WORKERS = 16
+
+
+class PreloadError(Exception):
+    def __init__(self, results):
+        self.results = results
+        failed = ", ".join(
+            f"{result.name} ({result.error})" for result in results if result.error
+        )
+        super().__init__(f"Unable to load the following parameters: {failed}")
+
 
 def parameter_info(config, name):
     parameter_spec = config._parameter_spec(name)
@@ -16,9 +31,57 @@ def all_parameter_info(config):
     return [parameter_info(config, name) for name in names]
 
 
-def preload(config):
+def _load(config, name):
+    start = time.monotonic()
+    try:
+        value = config[name]
+        error = "no value" if value is NOTHING else None
+    except Exception as e:
+        value, error = NOTHING, repr(e)
+    return PreloadResult(
+        name=name, value=value, elapsed=time.monotonic() - start, error=error
+    )
+
+
+def preload(
+    config,
+    max_workers: int = DEFAULT_PRELOAD_WORKERS,
+    timeout: Optional[float] = None,
+):
+    """Fetches every parameter concurrently on a bounded thread pool.
+
+    Returns a PreloadResult, with timing, for each parameter. Raises a
+    PreloadError reporting every failed parameter together, including
+    those still pending when the timeout passes.
+    """
     names = config._parameter_names()
-    values = list(config[name] for name in names)
-    errors = "".join(name for name, value in zip(names, values) if value is NOTHING)
-    if errors:
-        raise Exception(f"Unable to load the following parameters: {errors}")
+    start = time.monotonic()
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, min(max_workers, len(names))),
+        thread_name_prefix="config-preload",
+    )
+    futures = []
+    try:
+        futures = [executor.submit(_load, config, name) for name in names]
+        wait(futures, timeout=timeout)
+    finally:
+        # Do not start fetches still queued, nor wait on those which have
+        # overrun the deadline. shutdown(cancel_futures=True) needs 3.9.
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+    results = [
+        future.result()
+        if future.done() and not future.cancelled()
+        else PreloadResult(
+            name=name,
+            value=NOTHING,
+            elapsed=time.monotonic() - start,
+            error="timed out",
+        )
+        for name, future in zip(names, futures)
+    ]
+    if any(result.error for result in results):
+        raise PreloadError(results)
+    return results
@@ -2,3 +2,5 @@ from collections import namedtuple
 
 ParameterSpec = namedtuple("ParameterSpec", ["name", "type"])
 ParameterInfo = namedtuple("ParameterInfo", ["name", "type", "sources"])
+ResolutionPlan = namedtuple("ResolutionPlan", ["name", "type", "sources", "getters"])
+PreloadResult = namedtuple("PreloadResult", ["name", "value", "elapsed", "error"])
@@ -1,5 +1,25 @@
+from importlib import import_module
+
 from .default import Default, DefaultSecret  # noqa
 from .env import Env  # noqa
-from . import aws  # noqa
-from . import vault  # noqa
-from . import files  # noqa
+
+# Modules depending on slow to import libraries (boto3, hvac, python-dotenv,
+# asyncio) are only imported when first used.
+LAZY_MODULES = ("aws", "vault", "files", "aio")
+LAZY_ATTRIBUTES = {"Offload": "aio"}
+# Sources which can be named in source spec files -> module defining them
+LAZY_SOURCES = {
+    "Parameter": "aws",
+    "ParameterPath": "aws",
+    "Secret": "vault",
+    "DotEnvFile": "files",
+}
+
+
+def __getattr__(name):
+    if name in LAZY_MODULES:
+        return import_module(f".{name}", __name__)
+    if name in LAZY_ATTRIBUTES:
+        module = import_module(f".{LAZY_ATTRIBUTES[name]}", __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,9 +1,82 @@
 from abc import ABC, abstractmethod, abstractproperty
+from concurrent.futures import Future
+from typing import Collection, Dict
+import logging
+import threading
+import time
 
 from ..consts import NOTHING
+from . import metrics, refresh
+from .disk_cache import get_disk_cache
+from .resilience import SourceUnavailable
+
+logger = logging.getLogger(__name__)
+
+# flight key -> Future of the fetch in progress
+_inflight: Dict[tuple, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def single_flight(flight_key, fetch, *args):
+    """Calls fetch once for concurrent callers with the same flight key.
+
+    The first caller fetches, the others wait for and share its result,
+    or exception.
+    """
+    with _inflight_lock:
+        future = _inflight.get(flight_key)
+        leader = future is None
+        if leader:
+            future = _inflight[flight_key] = Future()
+    if not leader:
+        return future.result()
+    try:
+        result = fetch(*args)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(result)
+    finally:
+        with _inflight_lock:
+            del _inflight[flight_key]
+    return result
+
+
+# Guards the creation of the caches kept on cache hosts
+_host_caches_lock = threading.Lock()
+
+
+def host_cache(host, attribute: str, key: tuple) -> dict:
+    """The dict kept under key in a cache host's attribute, e.g. a source
+    spec's __source_cache__.
+
+    Both are created once, under a lock, so that concurrent first reads of a
+    host share them.
+    """
+    root = getattr(host, attribute, None)
+    cache = root.get(key) if root is not None else None
+    if cache is None:
+        with _host_caches_lock:
+            if not hasattr(host, attribute):
+                setattr(host, attribute, {})
+            cache = getattr(host, attribute).setdefault(key, {})
+    return cache
+
+
+# Relative cost of reading a source, by which Config(prefer_local=True)
+# orders the layers of a parameter
+LOCAL_COST = 0
+FILE_COST = 1
+REMOTE_COST = 2
+# Defaults are a last resort, tried after every other source
+FALLBACK_COST = 3
 
 
 class AbstractSourceDescriptor(ABC):
+    # Sources are assumed remote unless they say otherwise
+    _cost = REMOTE_COST
+
     @abstractproperty
     def _name(self):
         raise NotImplementedError
@@ -25,7 +98,40 @@ class AbstractSourceDescriptor(ABC):
         raise NotImplementedError
 
 
-class ValueSource(ABC):
+# Seconds remote sources remember a value is missing for, by default
+NEGATIVE_TTL = 30
+
+
+class NegativeCache:
+    """Remembers which values a source found missing (NOTHING), and when to
+    look for them again, separately from the values it has yet to fetch.
+    """
+
+    # Seconds a NOTHING result is kept for, 0 to look again on every read
+    _negative_ttl: float = 0
+    _get_time = staticmethod(time.monotonic)
+
+    def _get_missing(self, obj, objtype):
+        return host_cache(obj or objtype, "__source_missing__", self._key)
+
+    def _known_missing(self, obj, objtype):
+        expires_at = self._get_missing(obj, objtype).get(self._name)
+        return expires_at is not None and self._get_time() < expires_at
+
+    def _remember_missing(self, obj, objtype, names):
+        missing = self._get_missing(obj, objtype)
+        now = self._get_time()
+        expires_at = now + self._negative_ttl
+        for name in names:
+            if missing.get(name, now) <= now:
+                missing[name] = expires_at
+
+
+class ValueSource(NegativeCache, ABC):
+    # Set on remote sources, whose values are written to the source spec's
+    # disk cache, if it has one, to be served from it after a restart.
+    _persistent = False
+
     @abstractproperty
     def _value(self):
         raise NotImplementedError
@@ -33,64 +139,348 @@ class ValueSource(ABC):
     def __get__(self, obj, objtype):
         cache = self._get_cache(obj, objtype)
         if cache.get(self._name, NOTHING) is NOTHING:
-            cache[self._name] = self._value
-        return cache[self._name]
+            if self._negative_ttl and self._known_missing(obj, objtype):
+                if metrics.enabled:
+                    metrics.record_hit(self, nothing=True)
+                return NOTHING
+            flight_key = self._flight_key(cache)
+            fetched: Collection[str] = ()
+            try:
+                # A flight shared with siblings may not have fetched this
+                # value, which is then fetched by a flight of its own
+                while (
+                    self._name not in fetched
+                    and cache.get(self._name, NOTHING) is NOTHING
+                ):
+                    fetched = single_flight(
+                        flight_key, self._fetch_missing, cache, obj, objtype
+                    )
+            except SourceUnavailable as e:
+                # Not remembered as missing, it is looked up again next read
+                logger.warning(f"{e}, serving NOTHING.")
+            if metrics.enabled:
+                metrics.record_miss(self, cache.get(self._name, NOTHING) is NOTHING)
+        elif metrics.enabled:
+            metrics.record_hit(self)
+        return cache.get(self._name, NOTHING)
+
+    def _flight_key(self, cache):
+        """Identifies the fetch which concurrent reads of this value share.
+
+        Sources fetching their siblings' values along with their own may
+        share a single flight per cache, so that concurrent reads of
+        different values do not each fetch them all.
+        """
+        return (id(cache), self._name)
+
+    def _fetch_missing(self, cache, obj, objtype):
+        """Fetches this value into the cache, along with any siblings the
+        source fetches at the same time. Returns the names fetched.
+        """
+        # A fetch which finished while waiting to lead may have filled it
+        if cache.get(self._name, NOTHING) is not NOTHING:
+            return ()
+        disk = self._get_disk_cache(obj, objtype)
+        if disk is None:
+            fetched = self._fetch_new(cache, obj, objtype)
+            cache.update(fetched)
+        else:
+            disk_key = self._key + (self._name,)
+            fetched = disk.load(disk_key)
+            if fetched is not None:
+                cache.update(fetched)
+                disk.revalidate_values(
+                    self._key,
+                    list(fetched),
+                    lambda names: self._revalidate(disk, cache, obj, objtype, names),
+                )
+            else:
+                fetched = self._refetch(disk, cache, obj, objtype)
+
+        if self._negative_ttl:
+            # Siblings fetched at the same time may be missing as well
+            missing = [n for n, v in list(cache.items()) if v is NOTHING]
+            self._remember_missing(obj, objtype, missing)
+        return set(fetched)
+
+    def _fetch_new(self, cache, obj, objtype):
+        """Fetches the values missing from the cache, and returns them."""
+        fetched = dict((n, v) for n, v in list(cache.items()) if v is not NOTHING)
+        cached = set(fetched)
+        with metrics.fetching(self):
+            self._fetch(fetched, obj, objtype)
+        return dict((n, v) for n, v in fetched.items() if n not in cached)
+
+    def _refetch(self, disk, cache, obj, objtype):
+        """Fetches into the cache, and writes the values fetched to disk.
+
+        Returns the values fetched.
+        """
+        fetched = self._fetch_new(cache, obj, objtype)
+        cache.update(fetched)
+        disk.store(
+            dict(
+                (self._key + (name,), {name: value})
+                for name, value in fetched.items()
+                if value is not NOTHING
+            )
+        )
+        return fetched
+
+    def _revalidate(self, disk, cache, obj, objtype, names):
+        """Fetches values served from disk again, by name.
+
+        Values which are not found keep being served from disk.
+        """
+        with metrics.fetching(self):
+            fetched = self._fetch_values(names, obj, objtype)
+        fetched = dict((n, v) for n, v in fetched.items() if v is not NOTHING)
+        cache.update(fetched)
+        disk.store(
+            dict(
+                (self._key + (name,), {name: value}) for name, value in fetched.items()
+            )
+        )
+
+    def _fetch(self, cache, obj, objtype):
+        """Fills the cache with this source's value.
+
+        Sources able to fetch several values at once may override this to
+        fill in sibling values as well.
+        """
+        cache[self._name] = self._value
+
+    def _fetch_values(self, names, obj, objtype):
+        """Fetches the values of this source and its siblings, by name.
+
+        Sources able to fetch several values at once may override this.
+        """
+        sources = dict(
+            (source._name, source) for source in self._siblings(obj, objtype)
+        )
+        sources[self._name] = self
+        return dict((name, sources[name]._value) for name in names if name in sources)
+
+    def _siblings(self, obj, objtype):
+        """Sources of the source spec sharing this source's cache."""
+        spec = type(obj) if obj else objtype
+        for klass in spec.mro():
+            for source in klass.__dict__.values():
+                if isinstance(source, ValueSource) and source._key == self._key:
+                    yield source
+
+    def _get_disk_cache(self, obj, objtype):
+        return get_disk_cache(obj, objtype) if self._persistent else None
 
     def _get_cache(self, obj, objtype):
-        cache_host = obj or objtype
-        if not hasattr(cache_host, "__source_cache__"):
-            setattr(cache_host, "__source_cache__", {})
-        root_cache = getattr(cache_host, "__source_cache__")
-        cache_key = self._key
-        if cache_key not in root_cache:
-            root_cache[cache_key] = {}
-        return root_cache[cache_key]
+        return host_cache(obj or objtype, "__source_cache__", self._key)
+
 
+class DocumentSource(NegativeCache, ABC):
+    # Set on remote sources, see ValueSource
+    _persistent = False
 
-class DocumentSource(ABC):
     @abstractproperty
     def _doc(self):
         raise NotImplementedError
 
     def __get__(self, obj, objtype):
         cache = self._get_cache(obj, objtype)
+        missed = False
+        available = True
 
         if isinstance(self, DocumentSourceTTL):
             ttl = self._get_ttl(obj, objtype)
             ttl_data = ttl.get(self._key)
-            expired, ttl_data = self._expired(ttl_data)
-            if expired:
-                ttl[self._key] = ttl_data
-                cache.update(self._doc)
+            expired, new_ttl_data = self._expired(ttl_data)
+            if expired and not cache:
+                ttl[self._key] = new_ttl_data
+                available = self._load_or_keep(cache, lambda: not cache, obj, objtype)
+                missed = True
+            elif expired and self._refresh_interval and refresh.get_scheduler().running:
+                # Serve the cached document, the scheduler refreshes it. The
+                # ttl stamp is left for the refresh to see the document expired.
+                pass
+            elif expired:
+                ttl[self._key] = new_ttl_data
+                if self._refresh_in_background:
+                    self._background_refresh(obj, objtype)
+                else:
+                    available = self._load_or_keep(cache, lambda: True, obj, objtype)
+                    missed = True
+            elif new_ttl_data is not ttl_data:
+                # Checked, and found unexpired, e.g. an unchanged file
+                ttl[self._key] = new_ttl_data
+            if ttl_data is None:
+                refresh.get_scheduler().register(self, obj, objtype)
 
-        if cache.get(self._name, NOTHING) is NOTHING:
+        # A document just loaded is not loaded again for a missing name
+        if (
+            cache.get(self._name, NOTHING) is NOTHING
+            and not missed
+            and not (self._negative_ttl and self._known_missing(obj, objtype))
+        ):
             # cache.clear()
-            cache.update(self._doc)
+            available = self._load_or_keep(
+                cache, lambda: cache.get(self._name, NOTHING) is NOTHING, obj, objtype
+            )
+            missed = True
+        if (
+            missed
+            and available
+            and self._negative_ttl
+            and cache.get(self._name, NOTHING) is NOTHING
+        ):
+            self._remember_missing(obj, objtype, [self._name])
 
-        return cache[self._name]
+        value = cache.get(self._name, NOTHING)
+        if metrics.enabled:
+            if missed:
+                metrics.record_miss(self, value is NOTHING)
+            else:
+                metrics.record_hit(self, value is NOTHING)
+        return value
+
+    def _load(self, cache, needed, obj=None, objtype=None):
+        """Loads the document into the cache, once for concurrent callers.
+
+        needed is checked again by the caller which loads the document, as
+        a load finishing meanwhile may have made it unnecessary. A document
+        which has never been loaded is served from the disk cache, when
+        there is one, and refetched in the background.
+        """
+        disk = self._get_disk_cache(obj, objtype)
+
+        def load():
+            if not needed():
+                return
+            doc = disk.load(self._key) if disk is not None and not cache else None
+            if doc is not None:
+                cache.update(doc)
+                disk.revalidate(self._key, lambda: self._fetch_doc(cache, disk))
+            else:
+                self._fetch_doc(cache, disk)
+
+        single_flight((id(cache),), load)
+
+    def _load_or_keep(self, cache, needed, obj, objtype):
+        """Loads the document, keeping the last values while its backend is
+        unavailable. Returns whether the backend was available.
+        """
+        try:
+            self._load(cache, needed, obj, objtype)
+        except SourceUnavailable as e:
+            logger.warning(f"{e}, serving the last values.")
+            return False
+        return True
+
+    def _fetch_doc(self, cache, disk=None):
+        with metrics.fetching(self):
+            doc = self._doc
+        cache.update(doc)
+        if disk is not None:
+            disk.store({self._key: doc})
+
+    def _get_disk_cache(self, obj, objtype):
+        return get_disk_cache(obj, objtype) if self._persistent else None
 
     def _get_cache(self, obj, objtype):
-        cache_host = obj or objtype
-        if not hasattr(cache_host, "__source_cache__"):
-            setattr(cache_host, "__source_cache__", {})
-        root_cache = getattr(cache_host, "__source_cache__")
-        cache_key = self._key
-        if cache_key not in root_cache:
-            root_cache[cache_key] = {}
-        return root_cache[cache_key]
+        return host_cache(obj or objtype, "__source_cache__", self._key)
 
 
 class DocumentSourceTTL(ABC):
+    # When set, an expired document which has already been loaded keeps
+    # being served while it is reloaded on a background thread.
+    _refresh_in_background = False
+
     @abstractmethod
     def _expired(self):
         raise NotImplementedError
 
+    @property
+    def _refresh_interval(self):
+        """Seconds between scheduled refreshes, None to never schedule them."""
+        return getattr(self, "_ttl", None)
+
+    def _background_refresh(self, obj, objtype):
+        thread = threading.Thread(
+            target=self._refresh,
+            args=(obj, objtype),
+            name="config-refresh",
+            daemon=True,
+        )
+        thread.start()
+        return thread
+
+    def _refresh(self, obj, objtype):
+        """Reloads the document, keeping the last values if that fails.
+
+        Returns whether the refresh succeeded.
+        """
+        cache = self._get_cache(obj, objtype)
+        ttl = self._get_ttl(obj, objtype)
+        try:
+            _, ttl_data = self._expired(None)
+            self._fetch_doc(cache, self._get_disk_cache(obj, objtype))
+        except Exception:
+            logger.exception(f"Unable to refresh {self!r}, keeping last values.")
+            if metrics.enabled:
+                metrics.record_refresh(self, succeeded=False)
+            return False
+        ttl[self._key] = ttl_data
+        if metrics.enabled:
+            metrics.record_refresh(self, succeeded=True)
+        return True
+
     def _get_ttl(self, obj, objtype):
-        ttl_host = obj or objtype
-        if not hasattr(ttl_host, "__source_ttl__"):
-            setattr(ttl_host, "__source_ttl__", {})
-        root_ttl = getattr(ttl_host, "__source_ttl__")
-        ttl_key = self._key
-        if ttl_key not in root_ttl:
-            root_ttl[ttl_key] = {}
-        return root_ttl[ttl_key]
+        return host_cache(obj or objtype, "__source_ttl__", self._key)
+
+
+class AbstractAsyncSourceDescriptor(ABC):
+    """Async counterpart of AbstractSourceDescriptor.
+
+    Values are retrieved with ``await source._aget(obj, objtype)`` instead of
+    attribute access, so a fetch never blocks the event loop.
+    """
+
+    _cost = REMOTE_COST
+
+    @abstractproperty
+    def _name(self):
+        raise NotImplementedError
+
+    @abstractproperty
+    def _key(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def __repr__(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _aget(self, obj, objtype):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _get_cache(self, obj, objtype):
+        raise NotImplementedError
+
+
+class AsyncValueSource(ABC):
+    @abstractmethod
+    async def _avalue(self):
+        raise NotImplementedError
+
+    async def _aget(self, obj, objtype):
+        cache = self._get_cache(obj, objtype)
+        if cache.get(self._name, NOTHING) is NOTHING:
+            with metrics.fetching(self):
+                cache[self._name] = await self._avalue()
+            if metrics.enabled:
+                metrics.record_miss(self, cache[self._name] is NOTHING)
+        elif metrics.enabled:
+            metrics.record_hit(self)
+        return cache[self._name]
+
+    def _get_cache(self, obj, objtype):
+        return host_cache(obj or objtype, "__source_cache__", self._key)
@@ -0,0 +1,50 @@
+from concurrent.futures import Executor
+from typing import Optional
+import asyncio
+
+from .abc import REMOTE_COST, AbstractAsyncSourceDescriptor
+
+
+class Offload(AbstractAsyncSourceDescriptor):
+    """Adapts a synchronous source for use from asyncio.
+
+    Attribute access behaves exactly as the wrapped source does, while
+    ``_aget`` runs the blocking fetch in an executor so the event loop
+    keeps running.
+
+    :param source: any synchronous source, e.g. Env, DotEnvFile,
+        aws.Parameter or vault.Secret
+    :param executor: executor to run fetches in. Defaults to the event
+        loop's default executor.
+    """
+
+    def __init__(self, source, executor: Optional[Executor] = None):
+        self._source = source
+        self._executor = executor
+
+    @property
+    def _name(self):
+        return self._source._name
+
+    @property
+    def _key(self):
+        return self._source._key
+
+    @property
+    def _cost(self):
+        return getattr(self._source, "_cost", REMOTE_COST)
+
+    def __repr__(self):
+        return f"""Offload(source={self._source!r})"""
+
+    def __get__(self, obj, objtype):
+        return self._source.__get__(obj, objtype)
+
+    async def _aget(self, obj, objtype):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, self._source.__get__, obj, objtype
+        )
+
+    def _get_cache(self, obj, objtype):
+        return self._source._get_cache(obj, objtype)
@@ -1,19 +1,192 @@
+from importlib.util import find_spec
 from textwrap import dedent
+from typing import Any, Dict, Optional, Union
+import os
+import threading
+import time
 
-try:
-    import boto3
-    import botocore
+from ..consts import NOTHING
+from .abc import (
+    NEGATIVE_TTL,
+    AbstractSourceDescriptor,
+    ValueSource,
+    DocumentSource,
+    DocumentSourceTTL,
+)
+from .resilience import BURST, DEADLINE, RETRIES, TIMEOUT, Resilient
 
-    _boto = True
-except ImportError:
-    _boto = False
+# boto3 is only imported once a client is needed, as it is slow to import
+_boto = find_spec("boto3") is not None
 
-from ..consts import NOTHING
-from .abc import AbstractSourceDescriptor, ValueSource
+FIFTEEN_SECONDS = 15
+# Maximum number of names accepted by a single SSM GetParameters call
+GET_PARAMETERS_BATCH_SIZE = 10
+# Calls per second made to SSM by the process, shared by every source of the
+# same region, profile and endpoint: a share of SSM's default throughput for
+# GetParameters, so that a fleet starting at once is not throttled.
+RATE_LIMIT = 40
+# Error codes of throttled requests, which are retried
+THROTTLING_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "TooManyRequestsException",
+    "RequestLimitExceeded",
+}
+
+
+def is_plain_name(path):
+    """Whether a path is a parameter name, without a selector or ARN."""
+    return ":" not in path
+
+
+def chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+# Process-wide pool of SSM clients, keyed by (region, profile, endpoint_url,
+# session, timeout). Clients are thread-safe and keep their HTTP connections and
+# credentials warm between fetches.
+_clients: Dict[tuple, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def _reset_clients():
+    """Drops pooled clients, whose connections must not be shared after fork."""
+    global _clients_lock
+    _clients.clear()
+    _clients_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_clients)
+
+
+def get_client(
+    region=None, profile=None, endpoint_url=None, session=None, timeout=None
+):
+    """Returns the pooled SSM client for the given settings.
+
+    Clients make a single attempt per call, as sources retry themselves,
+    timing out after timeout seconds, or botocore's default when None.
+    """
+    pool_key = (region, profile, endpoint_url, session, timeout)
+    client = _clients.get(pool_key)
+    if client is None:
+        # Sessions are not thread-safe, so clients are created under the lock
+        with _clients_lock:
+            client = _clients.get(pool_key)
+            if client is None:
+                import botocore.config
+
+                if session is None:
+                    import boto3.session
+
+                    session = boto3.session.Session(profile_name=profile)
+                timeouts = {}
+                if timeout is not None:
+                    timeouts = dict(connect_timeout=timeout, read_timeout=timeout)
+                client = session.client(
+                    "ssm",
+                    region_name=region,
+                    endpoint_url=endpoint_url,
+                    config=botocore.config.Config(
+                        retries={"total_max_attempts": 1}, **timeouts
+                    ),
+                )
+                _clients[pool_key] = client
+    return client
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether a failed SSM call may succeed if retried: throttling, server
+    errors, connection errors and timeouts.
+    """
+    from botocore.exceptions import ClientError, ConnectionError, HTTPClientError
+
+    if isinstance(error, ClientError):
+        code = error.response.get("Error", {}).get("Code")
+        status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+        return code in THROTTLING_CODES or status >= 500
+    return isinstance(error, (ConnectionError, HTTPClientError))
 
 
-class Parameter(ValueSource, AbstractSourceDescriptor):
-    def __init__(self, path: str):
+class SSMClient(Resilient):
+    """Settings shared by sources fetching from SSM.
+
+    :param region: AWS region. Defaults to the session's region.
+    :param profile: AWS profile to create the session from.
+    :param endpoint_url: alternative SSM endpoint.
+    :param session: boto3 session to create the client from.
+
+    The timeout, deadline, retries, rate_limit and burst options are those
+    of resilience.Resilient. Fetches are rate limited to 40 calls per second
+    by default.
+    """
+
+    def _set_client_options(
+        self,
+        region: Optional[str] = None,
+        profile: Optional[str] = None,
+        endpoint_url: Optional[str] = None,
+        session=None,
+    ):
+        self._region = region
+        self._profile = profile
+        self._endpoint_url = endpoint_url
+        self._session = session
+
+    @property
+    def _client_key(self):
+        return self._region, self._profile, self._endpoint_url
+
+    @property
+    def _client(self):
+        return get_client(
+            region=self._region,
+            profile=self._profile,
+            endpoint_url=self._endpoint_url,
+            session=self._session,
+            timeout=self._timeout,
+        )
+
+    @property
+    def _backend_key(self):
+        return ("ssm",) + self._client_key
+
+    def _transient(self, error):
+        return is_transient(error)
+
+
+class Parameter(SSMClient, ValueSource, AbstractSourceDescriptor):
+    """Source from a SSM parameter.
+
+    :param path: of the parameter
+    :param negative_ttl: number of seconds a missing parameter is not looked up again for. Defaults to 30 seconds.
+
+    The region, profile, endpoint_url, session, timeout, deadline, retries,
+    rate_limit and burst options are those of SSMClient.
+    """
+
+    _persistent = True
+
+    def __init__(
+        self,
+        path: str,
+        region: Optional[str] = None,
+        profile: Optional[str] = None,
+        endpoint_url: Optional[str] = None,
+        session=None,
+        negative_ttl: Union[int, float] = NEGATIVE_TTL,
+        timeout: Optional[Union[int, float]] = TIMEOUT,
+        deadline: Optional[Union[int, float]] = DEADLINE,
+        retries: int = RETRIES,
+        rate_limit: Optional[float] = RATE_LIMIT,
+        burst: int = BURST,
+    ):
         if not _boto:
             raise ImportError(
                 dedent(
@@ -25,6 +198,9 @@ class Parameter(ValueSource, AbstractSourceDescriptor):
                 )
             )
         self._path = path
+        self._negative_ttl = negative_ttl
+        self._set_client_options(region, profile, endpoint_url, session)
+        self._set_resilience_options(timeout, deadline, retries, rate_limit, burst)
 
     @property
     def _name(self):
@@ -33,17 +209,186 @@ class Parameter(ValueSource, AbstractSourceDescriptor):
     @property
     def _key(self):
         name = type(self).__name__
-        return (name,)
+        return (name,) + self._client_key
 
     def __repr__(self):
         return f"""aws.Parameter(path="{self._path}")"""
 
     @property
     def _value(self):
-        client = boto3.client("ssm")
+        return self._values([self._path])[self._path]
+
+    def _values(self, paths):
+        from botocore.exceptions import ClientError
+
+        client = self._client
+        values = dict((path, NOTHING) for path in paths)
+        # GetParameters answers with plain names, without the version or label
+        # selector, or ARN, requested. Those are fetched on their own.
+        names = [path for path in paths if is_plain_name(path)]
+        singles = [path for path in paths if not is_plain_name(path)]
+        if names:
+            try:
+                response = self._call(
+                    lambda: client.get_parameters(Names=names, WithDecryption=True)
+                )
+            except ClientError:
+                # e.g. access denied to one of them, which must not hide
+                # the others
+                if len(names) > 1:
+                    singles.extend(names)
+            else:
+                # Paths reported in InvalidParameters are left as NOTHING
+                values.update(
+                    (parameter["Name"], parameter["Value"])
+                    for parameter in response["Parameters"]
+                )
+        for path in singles:
+            values[path] = self._single_value(path)
+        return values
+
+    def _single_value(self, path):
+        """Value of a parameter fetched on its own, NOTHING if unreadable."""
+        from botocore.exceptions import ClientError
+
+        client = self._client
+        try:
+            response = self._call(
+                lambda: client.get_parameter(Name=path, WithDecryption=True)
+            )
+        except ClientError:
+            return NOTHING
+        return response["Parameter"]["Value"]
+
+    def _siblings(self, obj, objtype):
+        """aws.Parameter sources sharing this source's cache."""
+        spec = type(obj) if obj else objtype
+        for klass in spec.mro():
+            for source in klass.__dict__.values():
+                if isinstance(source, Parameter) and source._key == self._key:
+                    yield source
+
+    def _flight_key(self, cache):
+        """Concurrent reads of any aws.Parameter of the source spec share a
+        fetch, as each fetch is of every uncached parameter.
+        """
+        return (id(cache),)
+
+    def _fetch(self, cache, obj, objtype):
+        """Fetches every uncached aws.Parameter in the source spec at once."""
+        paths = [self._path]
+        for source in self._siblings(obj, objtype):
+            if (
+                source._path not in paths
+                and cache.get(source._path, NOTHING) is NOTHING
+            ):
+                paths.append(source._path)
+        cache.update(self._fetch_values(paths, obj, objtype))
+
+    def _fetch_values(self, paths, obj, objtype):
+        """Fetches parameters by path, in as few calls as possible."""
+        values = {}
+        for batch in chunks(paths, GET_PARAMETERS_BATCH_SIZE):
+            values.update(self._values(batch))
+        return values
+
+
+class ParameterPath(
+    SSMClient, DocumentSource, DocumentSourceTTL, AbstractSourceDescriptor
+):
+    """Source from a hierarchy of SSM parameters.
+
+    Every parameter under the prefix is loaded at once, using paginated
+    recursive GetParametersByPath calls.
+
+    :param prefix: root of the parameter hierarchy, e.g. "/svc/prod"
+    :param path: to be read, relative to the prefix, e.g. "db/host"
+    :param ttl: number of seconds between reloading the hierarchy. Defaults to 15 seconds.
+    :param negative_ttl: number of seconds a path missing from the hierarchy is not reloaded for. Defaults to 30 seconds.
+
+    The region, profile, endpoint_url, session, timeout, deadline, retries,
+    rate_limit and burst options are those of aws.Parameter.
+    """
+
+    _persistent = True
+
+    def __init__(
+        self,
+        prefix: str,
+        path: str,
+        ttl: Union[int, float] = FIFTEEN_SECONDS,
+        region: Optional[str] = None,
+        profile: Optional[str] = None,
+        endpoint_url: Optional[str] = None,
+        session=None,
+        negative_ttl: Union[int, float] = NEGATIVE_TTL,
+        timeout: Optional[Union[int, float]] = TIMEOUT,
+        deadline: Optional[Union[int, float]] = DEADLINE,
+        retries: int = RETRIES,
+        rate_limit: Optional[float] = RATE_LIMIT,
+        burst: int = BURST,
+        _get_time=time.monotonic,
+    ):
+        if not _boto:
+            raise ImportError(
+                dedent(
+                    """
+                The aws.ParameterPath source requires the boto3 library.
+                Please reinstall using:
+                    pip install config-composer[AWS]
+            """
+                )
+            )
+        self._prefix = "/" + prefix.strip("/")
+        self._path = path.strip("/")
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._get_time = _get_time
+        self._set_client_options(region, profile, endpoint_url, session)
+        self._set_resilience_options(timeout, deadline, retries, rate_limit, burst)
+
+    @property
+    def _name(self):
+        return self._path
+
+    @property
+    def _key(self):
+        name = type(self).__name__
+        return (name, self._prefix) + self._client_key
+
+    def __repr__(self):
+        return f"""aws.ParameterPath(prefix="{self._prefix}", path="{self._path}", ttl="{self._ttl}")"""
+
+    def _expired(self, ttl_stamp):
+        time = self._get_time()
+        if not isinstance(ttl_stamp, dict) or (
+            (time - ttl_stamp["last_read"]) > self._ttl
+        ):
+            return True, {"last_read": time}
+        return False, ttl_stamp
+
+    @property
+    def _doc(self):
+        from botocore.exceptions import ClientError
+
+        client = self._client
+        paginator = client.get_paginator("get_parameters_by_path")
+        start = len(self._prefix.rstrip("/")) + 1
+        doc: dict = {}
+
+        def paginate():
+            # Retries start from the first page again
+            doc.clear()
+            for page in paginator.paginate(
+                Path=self._prefix, Recursive=True, WithDecryption=True
+            ):
+                doc.update(
+                    (parameter["Name"][start:], parameter["Value"])
+                    for parameter in page["Parameters"]
+                )
+
         try:
-            response = client.get_parameter(Name=self._path, WithDecryption=True)
-            value = response["Parameter"]["Value"]
-        except botocore.exceptions.ClientError:
-            value = NOTHING
-        return value
+            self._call(paginate)
+        except ClientError:
+            pass
+        return doc
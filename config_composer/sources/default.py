@@ -1,9 +1,11 @@
 from typing import Any
 
-from .abc import AbstractSourceDescriptor, ValueSource
+from .abc import FALLBACK_COST, AbstractSourceDescriptor, ValueSource
 
 
 class Default(ValueSource, AbstractSourceDescriptor):
+    _cost = FALLBACK_COST
+
     def __init__(self, value: Any):
         self._default_value = value
 
@@ -0,0 +1,233 @@
+"""Encrypted on-disk cache of remote source values, kept between restarts.
+
+Attach a DiskCache to a source spec as its __disk_cache__ attribute:
+
+    class SourceSpec:
+        __disk_cache__ = DiskCache("/var/cache/myapp/config.cache")
+        db_password = vault.Secret(path="db", field="password")
+
+Remote sources (aws.Parameter, aws.ParameterPath, vault.Secret) then write
+the values they fetch to the file, encrypted with a Fernet key read from
+the environment. After a restart, values younger than max_age are served
+from the file straight away and refetched once in the background. Older
+entries are ignored and fetched live. Values of the same source key served
+from the file are refetched together, in as few backend calls as the source
+can make.
+"""
+from importlib.util import find_spec
+from textwrap import dedent
+from typing import Dict, Optional, Union
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# cryptography is only imported once a cache is created
+_cryptography = find_spec("cryptography") is not None
+
+KEY_ENV_VAR = "CONFIG_COMPOSER_CACHE_KEY"
+ONE_HOUR = 60 * 60
+
+
+def generate_key() -> str:
+    """Returns a new key, to be set in the CONFIG_COMPOSER_CACHE_KEY env var."""
+    from cryptography.fernet import Fernet
+
+    return Fernet.generate_key().decode()
+
+
+def entry_key(source_key: tuple) -> str:
+    return json.dumps(list(source_key))
+
+
+class DiskCache:
+    """Encrypted file of source values, with their fetch time and max age.
+
+    :param path: of the cache file, created with 0600 permissions
+    :param max_age: number of seconds a value is served from the file for. Defaults to 1 hour.
+    :param key_env_var: environment variable holding the Fernet key
+    :param key: Fernet key, instead of the environment variable
+
+    The cache is disabled, with a warning, when there is no key. Files which
+    cannot be decrypted, e.g. after the key is rotated, are ignored.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_age: Union[int, float] = ONE_HOUR,
+        key_env_var: str = KEY_ENV_VAR,
+        key: Optional[Union[str, bytes]] = None,
+        _get_time=time.time,
+    ):
+        if not _cryptography:
+            raise ImportError(
+                dedent(
+                    """
+                The disk_cache.DiskCache requires the cryptography library.
+                Please reinstall using:
+                    pip install config-composer[cache]
+            """
+                )
+            )
+        from cryptography.fernet import Fernet
+
+        self._path = path
+        self._max_age = max_age
+        self._get_time = _get_time
+        self._lock = threading.Lock()
+        # entry key -> {"values": {...}, "fetched_at": ..., "max_age": ...}
+        self._entries: Optional[Dict[str, dict]] = None
+        # Entries served from the file, and since refetched or being refetched
+        self._revalidated: set = set()
+        # source key -> names served from the file, waiting to be refetched
+        self._pending: Dict[tuple, set] = {}
+        # Source keys with a refetch thread running
+        self._revalidating: set = set()
+
+        key = key or os.environ.get(key_env_var)
+        if not key:
+            logger.warning(
+                f"No key in the {key_env_var} environment variable, "
+                f"values will not be cached in {path}."
+            )
+            self._fernet = None
+        else:
+            self._fernet = Fernet(key)
+
+    def __repr__(self):
+        return f"""DiskCache(path="{self._path}", max_age="{self._max_age}")"""
+
+    @property
+    def enabled(self):
+        return self._fernet is not None
+
+    def _read(self):
+        from cryptography.fernet import InvalidToken
+
+        try:
+            with open(self._path, "rb") as f:
+                token = f.read()
+        except FileNotFoundError:
+            return {}
+        except OSError:
+            logger.warning(f"Unable to read {self!r}.", exc_info=True)
+            return {}
+        try:
+            return json.loads(self._fernet.decrypt(token))
+        except (InvalidToken, ValueError):
+            logger.warning(f"Ignoring {self!r}, it cannot be decrypted.")
+            return {}
+
+    def _write(self, entries):
+        import tempfile
+
+        token = self._fernet.encrypt(json.dumps(entries).encode())
+        directory = os.path.dirname(os.path.abspath(self._path))
+        try:
+            # Replaced atomically, so other processes never read a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".config-cache-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(token)
+            os.replace(tmp_path, self._path)
+        except OSError:
+            logger.warning(f"Unable to write {self!r}.", exc_info=True)
+
+    def _loaded_entries(self):
+        if self._entries is None:
+            self._entries = self._read()
+        return self._entries
+
+    def load(self, source_key: tuple) -> Optional[dict]:
+        """Values cached for a source key, None if missing or too old."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._loaded_entries().get(entry_key(source_key))
+        if entry is None:
+            return None
+        age = self._get_time() - entry["fetched_at"]
+        if not 0 <= age <= entry["max_age"]:
+            return None
+        return entry["values"]
+
+    def store(self, values: Dict[tuple, dict]):
+        """Stores freshly fetched values, by source key, in a single write."""
+        if not self.enabled or not values:
+            return
+        fetched_at = self._get_time()
+        with self._lock:
+            entries = self._loaded_entries()
+            for source_key, source_values in values.items():
+                try:
+                    json.dumps(source_values)
+                except (TypeError, ValueError):
+                    logger.warning(f"Not caching {source_key}, not serializable.")
+                    continue
+                entries[entry_key(source_key)] = {
+                    "values": source_values,
+                    "fetched_at": fetched_at,
+                    "max_age": self._max_age,
+                }
+                # Values fetched by this process need no revalidation
+                self._revalidated.add(source_key)
+            self._write(entries)
+
+    def revalidate(self, source_key: tuple, refetch):
+        """Calls refetch on a background thread, once per entry served."""
+        with self._lock:
+            if source_key in self._revalidated:
+                return None
+            self._revalidated.add(source_key)
+
+        def run():
+            try:
+                refetch()
+            except Exception:
+                logger.exception(f"Unable to revalidate {source_key} from {self!r}.")
+
+        thread = threading.Thread(target=run, name="config-revalidate", daemon=True)
+        thread.start()
+        return thread
+
+    def revalidate_values(self, source_key: tuple, names, refetch):
+        """Calls refetch(names) on a background thread, once per value served.
+
+        Names of a source key served while its refetch is running are
+        refetched together by the same thread, once it is done.
+        """
+        with self._lock:
+            pending = self._pending.setdefault(source_key, set())
+            for name in names:
+                if source_key + (name,) not in self._revalidated:
+                    self._revalidated.add(source_key + (name,))
+                    pending.add(name)
+            if not pending or source_key in self._revalidating:
+                return None
+            self._revalidating.add(source_key)
+
+        def run():
+            while True:
+                with self._lock:
+                    names = self._pending.pop(source_key, None)
+                    if not names:
+                        self._revalidating.discard(source_key)
+                        return
+                try:
+                    refetch(sorted(names))
+                except Exception:
+                    logger.exception(
+                        f"Unable to revalidate {source_key} from {self!r}."
+                    )
+
+        thread = threading.Thread(target=run, name="config-revalidate", daemon=True)
+        thread.start()
+        return thread
+
+
+def get_disk_cache(obj, objtype) -> Optional[DiskCache]:
+    """The DiskCache of a source spec, if any."""
+    return getattr(obj or objtype, "__disk_cache__", None)
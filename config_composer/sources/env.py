@@ -2,10 +2,12 @@ from typing import Optional
 import os
 
 from ..consts import NOTHING
-from .abc import AbstractSourceDescriptor, ValueSource
+from .abc import LOCAL_COST, AbstractSourceDescriptor, ValueSource
 
 
 class Env(ValueSource, AbstractSourceDescriptor):
+    _cost = LOCAL_COST
+
     def __init__(self, path: str, prefix: Optional[str] = None):
         if prefix is not None:
             self._path = prefix + path
@@ -1,19 +1,76 @@
+from collections import Counter
+from importlib.util import find_spec
 from textwrap import dedent
-from typing import Union
+from typing import Dict, Union
+import itertools
 import os
+import threading
 import time
 
-try:
-    from dotenv import dotenv_values
+from .abc import (
+    FILE_COST,
+    AbstractSourceDescriptor,
+    DocumentSource,
+    DocumentSourceTTL,
+)
+from .watch import get_watcher
 
-    _python_dotfile = True
-except ImportError:
-    _python_dotfile = True
-
-from .abc import AbstractSourceDescriptor, DocumentSource, DocumentSourceTTL
+# python-dotenv is only imported once an envfile is parsed
+_python_dotfile = find_spec("dotenv") is not None
 
 FIFTEEN_SECONDS = 15
 
+# dotenv_path -> counts of parsed and skipped (unchanged file) refreshes
+_stats: Dict[str, Counter] = {}
+_stats_lock = threading.Lock()
+
+
+def _count(dotenv_path, event):
+    with _stats_lock:
+        _stats.setdefault(dotenv_path, Counter())[event] += 1
+
+
+# absolute dotenv_path -> generation, bumped by the file watcher on changes.
+# Generations are never reused, not even by forked children.
+_generations: Dict[str, int] = {}
+_generations_lock = threading.Lock()
+_next_generation = itertools.count()
+
+
+def _changed(path):
+    with _generations_lock:
+        _generations[path] = next(_next_generation)
+
+
+def _reset_generations():
+    """The watcher is not inherited by forked children, files are watched
+    again on their next read, and reloaded once as changes made meanwhile
+    went unseen.
+    """
+    global _generations_lock
+    _generations.clear()
+    _generations_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_generations)
+
+
+def _watch(path):
+    """Starts watching an envfile, once, and returns its current generation."""
+    with _generations_lock:
+        if path in _generations:
+            return _generations[path]
+        generation = _generations[path] = next(_next_generation)
+    get_watcher().watch(path, _changed)
+    return generation
+
+
+def refresh_stats(dotenv_path):
+    """Number of times an envfile was parsed, or its reparse skipped."""
+    counts = _stats.get(dotenv_path, Counter())
+    return {"parses": counts["parses"], "skips": counts["skips"]}
+
 
 class DotEnvFile(DocumentSource, DocumentSourceTTL, AbstractSourceDescriptor):
     """Source from '.env' files.
@@ -21,13 +78,17 @@ class DotEnvFile(DocumentSource, DocumentSourceTTL, AbstractSourceDescriptor):
     :param path: to be read from the envfile
     :param dotenv_path: filepath for the envfile
     :param ttl: number of seconds between checking if the envfile has updated. Defaults to 15 seconds.
+    :param watch: reload the envfile as soon as it is written or replaced, instead of checking it every ttl seconds.
     """
 
+    _cost = FILE_COST
+
     def __init__(
         self,
         path: str,
         dotenv_path=".env",
         ttl: Union[int, float] = FIFTEEN_SECONDS,
+        watch: bool = False,
         _get_time=time.monotonic,
     ):
         if not _python_dotfile:
@@ -43,6 +104,8 @@ class DotEnvFile(DocumentSource, DocumentSourceTTL, AbstractSourceDescriptor):
         self._dotenv_path = dotenv_path
         self._path = path
         self._ttl = ttl
+        self._watch = watch
+        self._watch_path = os.path.abspath(dotenv_path)
         self._get_time = _get_time
 
     @property
@@ -57,26 +120,62 @@ class DotEnvFile(DocumentSource, DocumentSourceTTL, AbstractSourceDescriptor):
     def __repr__(self):
         return f"""DotEnvFile(path="{self._path}", dotenv_path="{self._dotenv_path}, ttl="{self._ttl}")"""
 
+    def _fingerprint(self):
+        stat = os.stat(self._dotenv_path)
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
     def _expired(self, ttl_stamp):
+        if self._watch:
+            return self._changed(ttl_stamp)
+
         time = self._get_time()
         if not isinstance(ttl_stamp, dict):
             expired = True
-            ttl_stamp = {
-                "last_modified_time": os.stat(self._dotenv_path).st_mtime,
-                "last_read": time,
-            }
+            ttl_stamp = {"fingerprint": self._fingerprint(), "last_read": time}
         elif (time - ttl_stamp["last_read"]) > self._ttl:
-            expired = True
-            ttl_stamp = {
-                "last_modified_time": os.stat(self._dotenv_path).st_mtime,
-                "last_read": time,
-            }
+            # Only reparse the file when it has changed
+            fingerprint = self._fingerprint()
+            expired = fingerprint != ttl_stamp["fingerprint"]
+            if not expired:
+                _count(self._dotenv_path, "skips")
+            ttl_stamp = {"fingerprint": fingerprint, "last_read": time}
         else:
             expired = False
 
         return expired, ttl_stamp
 
+    @property
+    def _refresh_interval(self):
+        # Watched envfiles are reloaded by the watcher instead
+        return None if self._watch else self._ttl
+
+    def _refresh(self, obj, objtype):
+        ttl = self._get_ttl(obj, objtype)
+        ttl_stamp = ttl.get(self._key)
+        if isinstance(ttl_stamp, dict) and "fingerprint" in ttl_stamp:
+            try:
+                fingerprint = self._fingerprint()
+            except OSError:
+                fingerprint = None
+            if fingerprint == ttl_stamp["fingerprint"]:
+                _count(self._dotenv_path, "skips")
+                ttl[self._key] = dict(ttl_stamp, last_read=self._get_time())
+                return True
+        return super()._refresh(obj, objtype)
+
+    def _changed(self, ttl_stamp):
+        """Expires the document when the watcher has seen the file change."""
+        generation = _generations.get(self._watch_path)
+        if generation is None:
+            generation = _watch(self._watch_path)
+        if not isinstance(ttl_stamp, dict) or ttl_stamp["generation"] != generation:
+            return True, {"generation": generation}
+        return False, ttl_stamp
+
     @property
     def _doc(self):
+        from dotenv import dotenv_values
+
         parsed = dotenv_values(stream=self._dotenv_path)
+        _count(self._dotenv_path, "parses")
         return parsed
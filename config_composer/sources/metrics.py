@@ -0,0 +1,262 @@
+"""Instrumentation of source fetches, cache reads and refreshes.
+
+Metrics are disabled by default, reads then only check the module level
+enabled flag. Once enabled, every source records into the process-wide
+registry, labelled by source class and cache key:
+
+- config_composer_source_cache_hits_total: reads served from the cache
+- config_composer_source_cache_misses_total: reads which had to fetch
+- config_composer_source_fetch_seconds: time taken by backend fetches
+- config_composer_source_fetch_errors_total: fetches which raised
+- config_composer_source_nothing_total: reads with no value (NOTHING)
+- config_composer_source_refreshes_total: TTL refreshes, by outcome
+- config_composer_source_rate_limit_wait_seconds: time backend calls were
+  queued for by a rate limit
+
+The registry is exported in the Prometheus text format with export(), and
+callbacks added with add_callback are called with every observation.
+"""
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, List, Tuple
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+enabled = False
+
+CACHE_HITS = "config_composer_source_cache_hits_total"
+CACHE_MISSES = "config_composer_source_cache_misses_total"
+FETCH_SECONDS = "config_composer_source_fetch_seconds"
+FETCH_ERRORS = "config_composer_source_fetch_errors_total"
+NOTHING_RESULTS = "config_composer_source_nothing_total"
+REFRESHES = "config_composer_source_refreshes_total"
+RATE_LIMIT_WAIT_SECONDS = "config_composer_source_rate_limit_wait_seconds"
+
+HELP = {
+    CACHE_HITS: ("counter", "Reads served from a source cache."),
+    CACHE_MISSES: ("counter", "Reads which fetched from the source backend."),
+    FETCH_SECONDS: ("histogram", "Duration of source backend fetches."),
+    FETCH_ERRORS: ("counter", "Source backend fetches which raised."),
+    NOTHING_RESULTS: ("counter", "Reads for which the source had no value."),
+    REFRESHES: ("counter", "Refreshes of TTL sources, by outcome."),
+    RATE_LIMIT_WAIT_SECONDS: (
+        "histogram",
+        "Time backend calls were queued for by a rate limit.",
+    ),
+}
+
+# Upper bounds, in seconds, of the fetch duration histogram buckets
+BUCKETS: Tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Registry:
+    """In-process store of counters and histograms.
+
+    :param buckets: upper bounds of histogram buckets, in increasing order.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self._buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        # (name, labels) -> [count per bucket..., count above them, sum, count]
+        self._histograms: Dict[Tuple[str, Labels], List[float]] = {}
+        self._callbacks: List[Callable[[str, dict, float], None]] = []
+
+    def inc(self, name: str, labels: Labels, amount: float = 1):
+        with self._lock:
+            total = self._counters.get((name, labels), 0) + amount
+            self._counters[name, labels] = total
+        self._notify(name, labels, amount)
+
+    def observe(self, name: str, labels: Labels, value: float):
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = [0] * (len(self._buckets) + 3)
+                self._histograms[name, labels] = histogram
+            for i, bound in enumerate(self._buckets):
+                if value <= bound:
+                    histogram[i] += 1
+                    break
+            else:
+                histogram[len(self._buckets)] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+        self._notify(name, labels, value)
+
+    def counter(self, name: str, **labels) -> float:
+        """Current value of a counter, 0 if it was never incremented."""
+        return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def histogram(self, name: str, **labels) -> dict:
+        """Count and sum of a histogram's observations."""
+        histogram = self._histograms.get((name, tuple(sorted(labels.items()))))
+        if histogram is None:
+            return {"count": 0, "sum": 0.0}
+        return {"count": histogram[-1], "sum": histogram[-2]}
+
+    def add_callback(self, callback: Callable[[str, dict, float], None]):
+        """Calls callback(name, labels, value) with every observation."""
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def remove_callback(self, callback: Callable[[str, dict, float], None]):
+        with self._lock:
+            self._callbacks.remove(callback)
+
+    def _notify(self, name, labels, value):
+        for callback in self._callbacks:
+            try:
+                callback(name, dict(labels), value)
+            except Exception:
+                logger.exception(f"Metrics callback {callback!r} failed.")
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def export(self) -> str:
+        """Renders every metric in the Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = dict((k, list(v)) for k, v in self._histograms.items())
+
+        lines = []
+        for name, (kind, help_text) in HELP.items():
+            samples = [
+                (labels, value)
+                for (sample_name, labels), value in sorted(counters.items())
+                if sample_name == name
+            ]
+            series = [
+                (labels, values)
+                for (sample_name, labels), values in sorted(histograms.items())
+                if sample_name == name
+            ]
+            if not samples and not series:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{format_labels(labels)} {float(value)!r}")
+            for labels, values in series:
+                cumulative: float = 0
+                for bound, count in zip(self._buckets + (float("inf"),), values):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    bucket_labels = format_labels(labels + (("le", le),))
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(labels)} {values[-2]!r}")
+                lines.append(f"{name}_count{format_labels(labels)} {values[-1]}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def format_labels(labels: Labels) -> str:
+    def escape(value):
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels) + "}"
+
+
+_registry = Registry()
+
+
+def get_registry() -> Registry:
+    return _registry
+
+
+def enable():
+    """Starts recording source metrics."""
+    global enabled
+    enabled = True
+
+
+def disable():
+    """Stops recording source metrics, already recorded ones are kept."""
+    global enabled
+    enabled = False
+
+
+def export() -> str:
+    return _registry.export()
+
+
+def add_callback(callback: Callable[[str, dict, float], None]):
+    _registry.add_callback(callback)
+
+
+def remove_callback(callback: Callable[[str, dict, float], None]):
+    _registry.remove_callback(callback)
+
+
+def source_labels(source, **extra) -> Labels:
+    key = ":".join(str(part) for part in source._key if part is not None)
+    labels = dict(extra, key=key, source=type(source).__name__)
+    return tuple(sorted(labels.items()))
+
+
+# Recording functions, called by sources only while metrics are enabled
+
+
+def record_hit(source, nothing: bool = False):
+    labels = source_labels(source)
+    _registry.inc(CACHE_HITS, labels)
+    if nothing:
+        _registry.inc(NOTHING_RESULTS, labels)
+
+
+def record_miss(source, nothing: bool):
+    labels = source_labels(source)
+    _registry.inc(CACHE_MISSES, labels)
+    if nothing:
+        _registry.inc(NOTHING_RESULTS, labels)
+
+
+def record_refresh(source, succeeded: bool):
+    outcome = "success" if succeeded else "error"
+    _registry.inc(REFRESHES, source_labels(source, outcome=outcome))
+
+
+def record_rate_limit_wait(source, seconds: float):
+    _registry.observe(RATE_LIMIT_WAIT_SECONDS, source_labels(source), seconds)
+
+
+@contextmanager
+def _fetching(source):
+    labels = source_labels(source)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        _registry.inc(FETCH_ERRORS, labels)
+        raise
+    finally:
+        _registry.observe(FETCH_SECONDS, labels, time.perf_counter() - start)
+
+
+def fetching(source):
+    """Context manager timing a backend fetch by source."""
+    if not enabled:
+        return nullcontext()
+    return _fetching(source)
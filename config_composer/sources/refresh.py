@@ -0,0 +1,202 @@
+"""Background refresh of TTL document sources.
+
+TTL sources register with the process-wide scheduler when first loaded,
+which holds their cache hosts (source specs) weakly, so that a Config which
+is no longer used is not kept alive by its registrations. Once started, the
+scheduler reloads them on a single daemon thread shortly
+before their ttl expires, with random jitter so replicas sharing a ttl do not
+refresh in step. Reads keep being served the cached values meanwhile
+(stale-while-revalidate) and never reload a document themselves.
+"""
+from typing import Dict, Optional
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+
+logger = logging.getLogger(__name__)
+
+# Refreshes are due between 80% and 90% of a source's ttl
+REFRESH_AHEAD = 0.9
+JITTER = 0.1
+# Lower bound on the delay between refreshes of a single source
+MIN_INTERVAL = 0.1
+
+
+class RefreshScheduler:
+    """Refreshes registered TTL sources ahead of expiry.
+
+    :param jitter: fraction of the ttl randomly taken off each delay.
+    :param _get_time: clock, for tests.
+    """
+
+    def __init__(self, jitter: float = JITTER, _get_time=time.monotonic):
+        self._jitter = jitter
+        self._get_time = _get_time
+        self._condition = threading.Condition()
+        self._queue: list = []
+        self._sequence = itertools.count()
+        # (id(host), source key) -> (source, weak reference to the host,
+        # whether the host is an instance rather than a source spec)
+        self._registered: Dict[tuple, tuple] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._metrics = {
+            "refreshes": 0,
+            "errors": 0,
+            "last_lag": 0.0,
+            "max_lag": 0.0,
+        }
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="config-refresh-scheduler", daemon=True
+                )
+                self._thread.start()
+                for registration in list(self._registered):
+                    self._schedule(registration)
+
+    def stop(self):
+        with self._condition:
+            thread, self._thread = self._thread, None
+            # Scheduled again on the next start
+            self._queue.clear()
+            self._condition.notify_all()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _after_fork(self):
+        """The thread does not survive fork, registrations are kept."""
+        self._condition = threading.Condition()
+        self._queue.clear()
+        self._thread = None
+
+    def register(self, source, obj, objtype):
+        """Refreshes a source's document, once per cache host, while the
+        scheduler runs. The registration is dropped with the host.
+        """
+        host = obj or objtype
+        registration = (id(host), source._key)
+        with self._condition:
+            if registration in self._registered:
+                return
+            try:
+                host_ref = weakref.ref(
+                    host,
+                    lambda _, registration=registration: self._registered.pop(
+                        registration, None
+                    ),
+                )
+            except TypeError:
+                # e.g. instances with __slots__, kept for the process' life
+                host_ref = lambda: host  # noqa: E731
+            self._registered[registration] = (source, host_ref, obj is not None)
+            if self.running:
+                self._schedule(registration)
+
+    def metrics(self):
+        """Refresh counts, and lag in seconds between due and actual refresh."""
+        with self._condition:
+            return dict(self._metrics, scheduled=len(self._queue))
+
+    def _delay(self, interval):
+        return max(
+            MIN_INTERVAL,
+            interval * (REFRESH_AHEAD - random.uniform(0, self._jitter)),
+        )
+
+    def _schedule(self, registration):
+        """Queues the next refresh of a registration, holding the lock."""
+        registered = self._registered.get(registration)
+        if registered is None:
+            return
+        source, _, _ = registered
+        interval = source._refresh_interval
+        if not interval:
+            return
+        due = self._get_time() + self._delay(interval)
+        entry = (due, next(self._sequence), registration)
+        heapq.heappush(self._queue, entry)
+        self._condition.notify_all()
+
+    def _resolve(self, registration):
+        """The source, obj and objtype of a registration, None once its host
+        is gone.
+        """
+        registered = self._registered.get(registration)
+        if registered is None:
+            return None
+        source, host_ref, is_instance = registered
+        host = host_ref()
+        if host is None:
+            return None
+        if is_instance:
+            return source, host, type(host)
+        return source, None, host
+
+    def _next_due(self):
+        """Waits for, and pops, the next due refresh. None once stopped."""
+        this_thread = threading.current_thread()
+        with self._condition:
+            while self._thread is this_thread:
+                if self._queue:
+                    wait = self._queue[0][0] - self._get_time()
+                    if wait <= 0:
+                        return heapq.heappop(self._queue)
+                else:
+                    wait = None
+                self._condition.wait(wait)
+        return None
+
+    def _run(self):
+        this_thread = threading.current_thread()
+        while True:
+            entry = self._next_due()
+            if entry is None:
+                return
+            due, _, registration = entry
+            resolved = self._resolve(registration)
+            if resolved is None:
+                continue
+            source, obj, objtype = resolved
+            lag = max(0.0, self._get_time() - due)
+            refreshed = source._refresh(obj, objtype)
+            # Not held while waiting for the next refresh
+            del resolved, obj, objtype
+            with self._condition:
+                self._metrics["refreshes"] += 1
+                self._metrics["errors"] += 0 if refreshed else 1
+                self._metrics["last_lag"] = lag
+                self._metrics["max_lag"] = max(self._metrics["max_lag"], lag)
+                if self._thread is this_thread and registration in self._registered:
+                    self._schedule(registration)
+
+
+_scheduler = RefreshScheduler()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=lambda: _scheduler._after_fork())
+
+
+def get_scheduler():
+    return _scheduler
+
+
+def start():
+    """Starts refreshing TTL sources in the background."""
+    _scheduler.start()
+
+
+def stop():
+    """Stops background refreshes, reads refresh expired sources again."""
+    _scheduler.stop()
@@ -0,0 +1,286 @@
+"""Retries, deadlines and circuit breaking for calls to remote backends.
+
+Remote sources make their backend calls through Resilient._call, which:
+
+- retries transient errors (throttling, 5xx, connection errors and
+  timeouts) with jittered exponential backoff
+- gives up once the source's deadline would pass
+- fails fast while the backend's circuit breaker is open, after
+  consecutive failures, until a trial call succeeds again
+- when the source sets a rate limit, waits for a token from the backend's
+  token bucket before each attempt, so that fetches are spread out rather
+  than bursting into the backend's own throttling
+
+A call which cannot complete raises SourceUnavailable. Sources then serve
+their last good value if they have one, or NOTHING, without remembering
+the value as missing.
+"""
+from typing import Callable, Dict, Optional, Union
+import logging
+import random
+import threading
+import time
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Seconds each call to a backend may take, as set on its client
+TIMEOUT = 5
+# Seconds a source may spend on a fetch, including retries
+DEADLINE = 10
+# Retries of a transient error, after the first attempt
+RETRIES = 2
+BASE_DELAY = 0.1
+MAX_DELAY = 2.0
+
+# Consecutive failures after which a backend's circuit opens
+FAILURE_THRESHOLD = 5
+# Seconds an open circuit fails fast for, before a trial call is let through
+RESET_TIMEOUT = 30
+
+# Calls per second allowed to a backend by default, and burst above it
+RATE_LIMIT: Optional[float] = None
+BURST = 10
+
+_sleep = time.sleep
+
+
+class SourceUnavailable(Exception):
+    """The backend of a source cannot be reached, or keeps failing."""
+
+
+def backoff(retry: int, base_delay=BASE_DELAY, max_delay=MAX_DELAY):
+    """Delay before a retry, with full jitter."""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** retry))
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, and lets a single trial call through
+    once reset_timeout seconds have passed.
+
+    :param failure_threshold: consecutive failures opening the circuit.
+    :param reset_timeout: seconds the circuit stays open for.
+    :param _get_time: clock, for tests.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(
+        self,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        reset_timeout: Union[int, float] = RESET_TIMEOUT,
+        _get_time=time.monotonic,
+    ):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._get_time = _get_time
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+
+    def __repr__(self):
+        return f"""CircuitBreaker(state="{self.state}", failures={self._failures})"""
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._get_time() - self._opened_at >= self._reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self):
+        """Whether a call may be made now."""
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self._failure_threshold:
+                self._opened_at = self._get_time()
+            self._trial = False
+
+
+# backend key -> circuit breaker, shared by every source of the backend
+_breakers: Dict[tuple, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(backend_key: tuple) -> CircuitBreaker:
+    breaker = _breakers.get(backend_key)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(backend_key, CircuitBreaker())
+    return breaker
+
+
+class TokenBucket:
+    """Allows rate calls per second, with bursts of up to burst calls.
+
+    Callers reserve a token and wait for it, in turn, so that calls beyond
+    the burst are queued at an even rate rather than rejected.
+
+    :param rate: tokens added per second.
+    :param burst: maximum number of tokens held.
+    :param _get_time: clock, for tests.
+    """
+
+    def __init__(self, rate: float, burst: int = BURST, _get_time=time.monotonic):
+        self._rate = rate
+        self._burst = burst
+        self._get_time = _get_time
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated_at = _get_time()
+
+    def __repr__(self):
+        return f"""TokenBucket(rate="{self._rate}", burst="{self._burst}")"""
+
+    def limit(self, rate: float, burst: int):
+        """Lowers the rate and burst, sources sharing a bucket get the lowest."""
+        with self._lock:
+            self._rate = min(self._rate, rate)
+            self._burst = min(self._burst, burst)
+            self._tokens = min(self._tokens, self._burst)
+
+    def reserve(self, max_wait: Optional[float] = None) -> Optional[float]:
+        """Takes a token, and returns the seconds to wait before using it.
+
+        Returns None, taking no token, when the wait would exceed max_wait.
+        """
+        with self._lock:
+            now = self._get_time()
+            self._tokens = min(
+                self._burst, self._tokens + (now - self._updated_at) * self._rate
+            )
+            self._updated_at = now
+            # Tokens go negative while callers are queued for them
+            wait = max(0.0, (1 - self._tokens) / self._rate)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+
+# backend key -> token bucket, shared by every rate limited source of the
+# backend
+_buckets: Dict[tuple, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(backend_key: tuple, rate: float, burst: int = BURST) -> TokenBucket:
+    bucket = _buckets.get(backend_key)
+    if bucket is None:
+        with _buckets_lock:
+            bucket = _buckets.setdefault(backend_key, TokenBucket(rate, burst))
+    if rate < bucket._rate or burst < bucket._burst:
+        bucket.limit(rate, burst)
+    return bucket
+
+
+class Resilient:
+    """Mixin for sources calling a remote backend.
+
+    :param timeout: number of seconds each backend call may take. Defaults to 5 seconds.
+    :param deadline: number of seconds a fetch may take, including retries. Defaults to 10 seconds.
+    :param retries: number of times transient errors are retried. Defaults to 2.
+    :param rate_limit: number of calls per second made to the backend by the process, shared with other sources of the backend. Defaults to no limit.
+    :param burst: number of calls which may be made at once, within the rate limit. Defaults to 10.
+    """
+
+    def _set_resilience_options(
+        self,
+        timeout: Optional[Union[int, float]] = TIMEOUT,
+        deadline: Optional[Union[int, float]] = DEADLINE,
+        retries: int = RETRIES,
+        rate_limit: Optional[float] = RATE_LIMIT,
+        burst: int = BURST,
+    ):
+        self._timeout = timeout
+        self._deadline = deadline
+        self._retries = retries
+        self._rate_limit = rate_limit
+        self._burst = burst
+
+    @property
+    def _backend_key(self) -> tuple:
+        """Identifies the backend, whose circuit breaker and rate limit sources
+        share.
+        """
+        raise NotImplementedError
+
+    def _transient(self, error: Exception) -> bool:
+        """Whether the backend call may succeed if retried."""
+        raise NotImplementedError
+
+    def _wait_for_token(self, rate_limit: float, start: float):
+        """Waits for the backend's rate limit, unless that passes the deadline."""
+        bucket = get_bucket(self._backend_key, rate_limit, self._burst)
+        max_wait = None
+        if self._deadline is not None:
+            max_wait = max(0.0, self._deadline - (time.monotonic() - start))
+        wait = bucket.reserve(max_wait)
+        if wait is None:
+            raise SourceUnavailable(f"{self!r}: rate limited past the deadline")
+        if metrics.enabled:
+            metrics.record_rate_limit_wait(self, wait)
+        if wait:
+            _sleep(wait)
+
+    def _call(self, fetch: Callable):
+        """Calls fetch, retrying transient errors within the deadline.
+
+        Raises SourceUnavailable when the backend's circuit is open, or
+        transient errors persist.
+        """
+        breaker = get_breaker(self._backend_key)
+        if breaker.state == breaker.OPEN:
+            raise SourceUnavailable(f"{self!r}: circuit open for {self._backend_key}")
+        start = time.monotonic()
+        retry = 0
+        while True:
+            if self._rate_limit:
+                self._wait_for_token(self._rate_limit, start)
+            if not breaker.allow():
+                raise SourceUnavailable(
+                    f"{self!r}: circuit open for {self._backend_key}"
+                )
+            try:
+                result = fetch()
+            except Exception as e:
+                if not self._transient(e):
+                    # The backend answered, the request itself is at fault
+                    breaker.success()
+                    raise
+                breaker.failure()
+                delay = backoff(retry)
+                elapsed = time.monotonic() - start
+                if (
+                    retry >= self._retries
+                    or (self._deadline is not None and elapsed + delay > self._deadline)
+                    or breaker.state == breaker.OPEN
+                ):
+                    raise SourceUnavailable(f"{self!r}: {e!r}") from e
+                logger.info(f"Retrying {self!r} in {delay:.2f}s after {e!r}")
+                retry += 1
+                _sleep(delay)
+            else:
+                breaker.success()
+                return result
@@ -1,23 +1,158 @@
+from importlib.util import find_spec
 from textwrap import dedent
+from typing import Any, Dict, Optional, Union
+import os
+import threading
+import time
 
-try:
-    import hvac
+from .abc import (
+    NEGATIVE_TTL,
+    AbstractSourceDescriptor,
+    DocumentSource,
+    DocumentSourceTTL,
+)
+from .resilience import BURST, DEADLINE, RATE_LIMIT, RETRIES, TIMEOUT, Resilient
 
-    _hvac = True
-except ImportError:
-    _hvac = False
+# hvac is only imported once a client is needed, as it is slow to import
+_hvac = find_spec("hvac") is not None
 
-from ..consts import NOTHING
-from .abc import AbstractSourceDescriptor, ValueSource
+# Secrets are refreshed once this fraction of their ttl has passed
+REFRESH_AHEAD = 0.75
 
+# Process-wide pool of Vault clients, one per (server, timeout). Each client
+# keeps a requests session, and hence its HTTP connections, alive between
+# reads.
+_clients: Dict[tuple, Any] = {}
+# (server, mount_point) -> (kv version, time of lookup)
+_kv_versions: Dict[tuple, tuple] = {}
+# (server, mount_point, path) -> lease duration, in seconds, of the last read
+_leases: Dict[tuple, float] = {}
+_lock = threading.Lock()
+
+
+def _reset_clients():
+    """Drops pooled clients, whose connections must not be shared after fork."""
+    global _lock
+    _clients.clear()
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_clients)
+
+
+def get_client(server, timeout=TIMEOUT):
+    """Returns the pooled client for a Vault server.
+
+    Requests time out after timeout seconds, or never when None.
+    """
+    pool_key = (server, timeout)
+    client = _clients.get(pool_key)
+    if client is None:
+        with _lock:
+            client = _clients.get(pool_key)
+            if client is None:
+                import hvac
+
+                client = _clients[pool_key] = hvac.Client(url=server, timeout=timeout)
+    return client
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether a failed Vault request may succeed if retried: rate limiting,
+    server errors, a sealed Vault, connection errors and timeouts.
+    """
+    from hvac.exceptions import (
+        BadGateway,
+        InternalServerError,
+        RateLimitExceeded,
+        VaultDown,
+    )
+    from requests.exceptions import ConnectionError, Timeout
+
+    return isinstance(
+        error,
+        (
+            BadGateway,
+            InternalServerError,
+            RateLimitExceeded,
+            VaultDown,
+            ConnectionError,
+            Timeout,
+        ),
+    )
+
+
+def get_kv_version(
+    client, server: str, mount_point: str, ttl: Optional[Union[int, float]] = None
+):
+    """Returns the KV secrets engine version of a mount point.
+
+    Lookups are cached for the life of the process, or for ttl seconds.
+    """
+    cache_key = (server, mount_point)
+    cached = _kv_versions.get(cache_key)
+    now = time.monotonic()
+    if cached is not None and (ttl is None or (now - cached[1]) <= ttl):
+        return cached[0]
+    version = client.sys.retrieve_mount_option(
+        mount_point=mount_point, option_name="version"
+    )
+    _kv_versions[cache_key] = (version, now)
+    return version
+
+
+def lease_duration(response):
+    """Seconds the secret is valid for, as reported by Vault, if any.
+
+    Uses the lease_duration of the response, or a "ttl" entry in the
+    custom_metadata of a KV v2 secret.
+    """
+    if response.get("lease_duration"):
+        return float(response["lease_duration"])
+    metadata = (response.get("data") or {}).get("metadata") or {}
+    custom_metadata = metadata.get("custom_metadata") or {}
+    if custom_metadata.get("ttl"):
+        return float(custom_metadata["ttl"])
+    return None
+
+
+class Secret(Resilient, DocumentSource, DocumentSourceTTL, AbstractSourceDescriptor):
+    """Source from a Vault KV secret.
+
+    :param path: of the secret
+    :param field: to be read from the secret
+    :param mount_point: of the KV secrets engine
+    :param server: url of the Vault server
+    :param mount_ttl: number of seconds to cache the KV version of the mount for. Defaults to the life of the process.
+    :param ttl: number of seconds before the secret is refreshed. Defaults to the lease reported by Vault, or never if there is none.
+    :param negative_ttl: number of seconds a field missing from the secret is not read again for. Defaults to 30 seconds.
+
+    The timeout, deadline, retries, rate_limit and burst options are those
+    of resilience.Resilient. Reads are not rate limited by default.
+
+    Refreshes run in the background ahead of expiry, and the last values are
+    kept when they fail.
+    """
+
+    _refresh_in_background = True
+    _persistent = True
 
-class Secret(ValueSource, AbstractSourceDescriptor):
     def __init__(
         self,
         path: str,
         field: str,
         mount_point="secret",
         server="http://localhost:8200",
+        mount_ttl: Optional[Union[int, float]] = None,
+        ttl: Optional[Union[int, float]] = None,
+        negative_ttl: Union[int, float] = NEGATIVE_TTL,
+        timeout: Optional[Union[int, float]] = TIMEOUT,
+        deadline: Optional[Union[int, float]] = DEADLINE,
+        retries: int = RETRIES,
+        rate_limit: Optional[float] = RATE_LIMIT,
+        burst: int = BURST,
+        _get_time=time.monotonic,
     ):
         if not _hvac:
             raise ImportError(
@@ -33,6 +168,11 @@ class Secret(ValueSource, AbstractSourceDescriptor):
         self._mount_point = mount_point
         self._server = server
         self._field = field
+        self._mount_ttl = mount_ttl
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._get_time = _get_time
+        self._set_resilience_options(timeout, deadline, retries, rate_limit, burst)
 
     @property
     def _name(self):
@@ -47,21 +187,60 @@ class Secret(ValueSource, AbstractSourceDescriptor):
         return f"""vault.Secret(path="{self._path}", field="{self._field}", mount_point="{self._mount_point}", server="{self._server}")"""
 
     @property
-    def _value(self):
-        client = hvac.Client(url=self._server)
-        secret_version = client.sys.retrieve_mount_option(
-            mount_point=self._mount_point, option_name="version"
+    def _read_key(self):
+        return self._server, self._mount_point, self._path
+
+    def _lease_ttl(self):
+        lease = _leases.get(self._read_key)
+        ttls = [t for t in (self._ttl, lease) if t is not None]
+        return min(ttls) if ttls else None
+
+    @property
+    def _refresh_interval(self):
+        return self._lease_ttl()
+
+    def _expired(self, ttl_stamp):
+        time = self._get_time()
+        if not isinstance(ttl_stamp, dict):
+            return True, {"last_read": time}
+        ttl = self._lease_ttl()
+        if ttl is not None and (time - ttl_stamp["last_read"]) > ttl * REFRESH_AHEAD:
+            return True, {"last_read": time}
+        return False, ttl_stamp
+
+    @property
+    def _backend_key(self):
+        return ("vault", self._server)
+
+    def _transient(self, error):
+        return is_transient(error)
+
+    @property
+    def _doc(self):
+        """All fields of the secret, read once for every field requested."""
+        return self._call(self._read_secret)
+
+    def _read_secret(self):
+        from hvac.exceptions import InvalidPath
+
+        client = get_client(self._server, self._timeout)
+        secret_version = get_kv_version(
+            client, self._server, self._mount_point, ttl=self._mount_ttl
         )
-        client.secrets.kv.default_kv_version = secret_version
-        if secret_version == "1":
-            read_secret = client.secrets.kv.read_secret
-        elif secret_version == "2":
-            read_secret = client.secrets.kv.read_secret_version
         try:
-            response = read_secret(path=self._path)
-            if "errors" in response:
-                return NOTHING
-            value = response["data"]["data"].get(self._field, NOTHING)
-        except hvac.exceptions.InvalidPath:
-            value = NOTHING
-        return value
+            if secret_version == "1":
+                response = client.secrets.kv.v1.read_secret(
+                    path=self._path, mount_point=self._mount_point
+                )
+                data = response["data"]
+            else:
+                response = client.secrets.kv.v2.read_secret_version(
+                    path=self._path, mount_point=self._mount_point
+                )
+                if "errors" in response:
+                    return {}
+                data = response["data"]["data"]
+            _leases[self._read_key] = lease_duration(response)
+            return data
+        except InvalidPath:
+            return {}
@@ -0,0 +1,205 @@
+"""File watching used to invalidate file sources as soon as they change.
+
+A single daemon thread per process serves every watched path. On Linux the
+thread blocks on inotify, elsewhere it polls file fingerprints.
+"""
+from typing import Callable, Dict, List, Optional, Set
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 1.0
+
+# inotify event masks, see inotify(7)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+# Directories are watched, so that atomic replaces (rename over the file)
+# are seen as well as writes.
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+)
+# struct inotify_event {int wd; uint32_t mask; uint32_t cookie; uint32_t len;}
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+def fingerprint(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class PollingBackend:
+    """Detects changes by comparing file fingerprints every interval."""
+
+    def __init__(self, interval: float = POLL_INTERVAL):
+        self._interval = interval
+        self._fingerprints: Dict[str, Optional[tuple]] = {}
+
+    def add(self, path):
+        self._fingerprints[path] = fingerprint(path)
+
+    def wait(self, paths: Set[str]):
+        time.sleep(self._interval)
+        changed = set()
+        for path in paths:
+            current = fingerprint(path)
+            if current != self._fingerprints.get(path):
+                self._fingerprints[path] = current
+                changed.add(path)
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyBackend:
+    """Linux inotify, through libc, watching the directory of each path."""
+
+    def __init__(self, timeout: float = POLL_INTERVAL):
+        self._timeout = timeout
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._directories: Dict[int, str] = {}
+
+    def add(self, path):
+        directory = os.path.dirname(path)
+        if directory in self._directories.values():
+            return
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), directory)
+        self._directories[wd] = directory
+
+    def wait(self, paths: Set[str]):
+        readable, _, _ = select.select([self._fd], [], [], self._timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped, assume everything changed
+                return set(paths)
+            directory = self._directories.get(wd)
+            if directory is not None and name:
+                changed.add(os.path.join(directory, os.fsdecode(name)))
+        return changed & paths
+
+    def close(self):
+        os.close(self._fd)
+
+
+def default_backend():
+    try:
+        return InotifyBackend()
+    except (OSError, AttributeError):
+        # No inotify on this platform, e.g. macOS or Windows
+        return PollingBackend()
+
+
+class Watcher:
+    """Calls back when watched files are written or replaced.
+
+    :param backend: InotifyBackend or PollingBackend. Defaults to inotify
+        when available.
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend or default_backend()
+        self._callbacks: Dict[str, List[Callable[[str], None]]] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, path: str, callback: Callable[[str], None]):
+        path = os.path.abspath(path)
+        with self._lock:
+            self._backend.add(path)
+            self._callbacks.setdefault(path, []).append(callback)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="config-watcher", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._backend.close()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            with self._lock:
+                paths = set(self._callbacks)
+            try:
+                changed = self._backend.wait(paths)
+            except Exception:
+                logger.exception("File watcher failed, retrying.")
+                time.sleep(POLL_INTERVAL)
+                continue
+            for path in changed:
+                for callback in self._callbacks.get(path, []):
+                    try:
+                        callback(path)
+                    except Exception:
+                        logger.exception(f"File watcher callback for '{path}' failed.")
+
+
+_watcher: Optional[Watcher] = None
+_watcher_lock = threading.Lock()
+
+
+def _reset_watcher():
+    """The watcher thread does not survive fork, a new one is started on use."""
+    global _watcher, _watcher_lock
+    _watcher = None
+    _watcher_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_watcher)
+
+
+def get_watcher():
+    """Returns the process-wide watcher."""
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = Watcher()
+        return _watcher
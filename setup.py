@@ -13,5 +13,10 @@ setup(
     setup_requires=[],
     install_requires=[],
     tests_require=[],
-    extras_require={"AWS": ["boto3"], "Vault": ["hvac"], "dotenv": ["python-dotenv"]},
+    extras_require={
+        "AWS": ["boto3"],
+        "Vault": ["hvac"],
+        "dotenv": ["python-dotenv"],
+        "cache": ["cryptography"],
+    },
 )
@@ -0,0 +1,201 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from config_composer.consts import NOTHING
+from config_composer.core import AsyncConfig, Spec, ParameterError
+from config_composer.core.aio import apreload
+from config_composer.core.utils import PreloadError
+from config_composer.sources import Default, Env, Offload
+from config_composer.sources.abc import (
+    AbstractAsyncSourceDescriptor,
+    AsyncValueSource,
+    ValueSource,
+    AbstractSourceDescriptor,
+)
+
+
+class BlockingSource(ValueSource, AbstractSourceDescriptor):
+    def __init__(self, path, delay):
+        self._path = path
+        self._delay = delay
+        self.threads = []
+
+    @property
+    def _name(self):
+        return self._path
+
+    @property
+    def _key(self):
+        return (type(self).__name__,)
+
+    def __repr__(self):
+        return f"""BlockingSource(path="{self._path}")"""
+
+    @property
+    def _value(self):
+        self.threads.append(threading.current_thread())
+        time.sleep(self._delay)
+        return self._path
+
+
+class MyAsyncSource(AsyncValueSource, AbstractAsyncSourceDescriptor):
+    def __init__(self, path):
+        self._path = path
+
+    @property
+    def _name(self):
+        return self._path
+
+    @property
+    def _key(self):
+        return (type(self).__name__,)
+
+    def __repr__(self):
+        return f"""MyAsyncSource(path="{self._path}")"""
+
+    async def _avalue(self):
+        await asyncio.sleep(0)
+        return self._path
+
+
+def test_aget_offloads_sync_sources(environ, random_integer):
+    environ["FOO"] = str(random_integer)
+    source = BlockingSource("bar", 0)
+
+    class ConfigSpec(Spec):
+        foo: int
+        bar: str
+
+    class SourceSpec:
+        foo = Env(path="FOO")
+        bar = source
+
+    config = AsyncConfig(config_spec=ConfigSpec, source_spec=SourceSpec)
+
+    assert asyncio.run(config.aget("foo")) == random_integer
+    assert asyncio.run(config.aget("bar")) == "bar"
+    assert source.threads and threading.main_thread() not in source.threads
+
+    # sync api keeps working
+    assert config.foo == random_integer
+    assert config["bar"] == "bar"
+
+
+def test_aget_native_async_source():
+    class ConfigSpec(Spec):
+        foo: str
+
+    class SourceSpec:
+        foo = MyAsyncSource("foo")
+
+    config = AsyncConfig(config_spec=ConfigSpec, source_spec=SourceSpec)
+
+    assert asyncio.run(config.aget("foo")) == "foo"
+
+
+def test_aget_plain_value():
+    class ConfigSpec(Spec):
+        foo: str
+
+    class SourceSpec:
+        foo = "plain"
+
+    config = AsyncConfig(config_spec=ConfigSpec, source_spec=SourceSpec)
+
+    assert asyncio.run(config.aget("foo")) == "plain"
+    assert config.foo == "plain"
+
+
+def test_aget_falls_through_sources_without_value(random_string):
+    class ConfigSpec(Spec):
+        foo: str
+
+    class SourceSpec1:
+        foo = Env(path="NOT_SET_FOO")
+
+    class SourceSpec2:
+        foo = MyAsyncSource(random_string)
+
+    config = AsyncConfig(config_spec=ConfigSpec, source_spec=(SourceSpec1, SourceSpec2))
+
+    assert asyncio.run(config.aget("foo")) == random_string
+
+
+def test_aget_unknown_parameter():
+    class ConfigSpec(Spec):
+        foo: str
+
+    class SourceSpec:
+        foo = Default("foo")
+
+    config = AsyncConfig(config_spec=ConfigSpec, source_spec=SourceSpec)
+
+    with pytest.raises(ParameterError):
+        asyncio.run(config.aget("bar"))
+
+
+def test_offload_keeps_event_loop_running():
+    source = Offload(BlockingSource("foo", 0.2))
+
+    class SourceSpec:
+        foo = source
+
+    ticks = []
+
+    async def tick():
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    async def main():
+        return await asyncio.gather(source._aget(None, SourceSpec), tick())
+
+    value, _ = asyncio.run(main())
+
+    assert value == "foo"
+    assert len(ticks) == 5
+    assert SourceSpec.foo == "foo"
+
+
+def test_apreload_gathers_fetches():
+    names = [f"param_{i}" for i in range(10)]
+    ConfigSpec = type(
+        "ConfigSpec", (Spec,), {"__annotations__": dict((n, str) for n in names)}
+    )
+    SourceSpec = type(
+        "SourceSpec", (), dict((n, BlockingSource(n, 0.2)) for n in names)
+    )
+    config = AsyncConfig(config_spec=ConfigSpec, source_spec=SourceSpec)
+
+    start = time.monotonic()
+    results = asyncio.run(apreload(config))
+
+    assert time.monotonic() - start < 1.0
+    assert [result.value for result in results] == names
+
+
+def test_apreload_reports_failures(environ):
+    try:
+        del environ["FOO"]
+    except KeyError:
+        pass
+
+    class ConfigSpec(Spec):
+        foo: str
+        bar: str
+
+    class SourceSpec:
+        foo = Default("foo")
+        bar = Env(path="FOO")
+
+    config = AsyncConfig(config_spec=ConfigSpec, source_spec=SourceSpec)
+
+    with pytest.raises(PreloadError) as excinfo:
+        asyncio.run(apreload(config))
+
+    results = dict((result.name, result) for result in excinfo.value.results)
+    assert results["foo"].error is None
+    assert results["bar"].value is NOTHING
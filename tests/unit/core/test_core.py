@@ -1,15 +1,64 @@
 from textwrap import dedent
 from tempfile import NamedTemporaryFile
+import time
 
 import pytest
 
+from config_composer.consts import NOTHING
 from config_composer.core import Spec, Config, String, Integer, ParameterError
-from config_composer.core.utils import preload
+from config_composer.core import config as config_module
+from config_composer.core.utils import preload, PreloadError
 from config_composer.sources import aws, vault, files
 from config_composer.sources.default import Default
+from config_composer.sources.abc import AbstractSourceDescriptor, ValueSource
 from config_composer.sources.env import Env
 
 
+class SlowSource(ValueSource, AbstractSourceDescriptor):
+    def __init__(self, path, delay):
+        self._path = path
+        self._delay = delay
+
+    @property
+    def _name(self):
+        return self._path
+
+    @property
+    def _key(self):
+        return (type(self).__name__,)
+
+    def __repr__(self):
+        return f"""SlowSource(path="{self._path}", delay={self._delay})"""
+
+    @property
+    def _value(self):
+        time.sleep(self._delay)
+        return self._path
+
+
+class RemoteSource(ValueSource, AbstractSourceDescriptor):
+    def __init__(self, path, value=NOTHING):
+        self._path = path
+        self._remote_value = value
+        self.reads = 0
+
+    @property
+    def _name(self):
+        return self._path
+
+    @property
+    def _key(self):
+        return (type(self).__name__, id(self))
+
+    def __repr__(self):
+        return f"""RemoteSource(path="{self._path}")"""
+
+    @property
+    def _value(self):
+        self.reads += 1
+        return self._remote_value
+
+
 # Test loading source spec from files
 def test_source_spec_from_yaml_file(environ, random_string):
     environ["VALUE"] = str(random_string)
@@ -60,6 +109,62 @@ def test_source_spec_from_ini_file(environ, random_string):
     assert config.foo == random_string
 
 
+def test_source_spec_files_are_parsed_once(environ, monkeypatch, tmp_path):
+    environ["VALUE"] = "foo"
+    parses = []
+    parse_ini = config_module.FILETYPE_FACTORIES[".ini"]
+
+    def counting_parse_ini(filepath):
+        parses.append(filepath)
+        return parse_ini(filepath)
+
+    monkeypatch.setitem(config_module.FILETYPE_FACTORIES, ".ini", counting_parse_ini)
+    spec_path = tmp_path / "spec.ini"
+    spec_path.write_text("[parameter_foo]\nsource=Env\npath=VALUE\n")
+    environ["SOURCE_SPEC_PATH"] = str(spec_path)
+
+    class ConfigSpec(Spec):
+        foo: str
+
+    for _ in range(3):
+        config = Config(config_spec=ConfigSpec, env_var="SOURCE_SPEC_PATH")
+        assert config.foo == "foo"
+    assert len(parses) == 1
+
+    # Modified files are parsed again
+    spec_path.write_text("[parameter_foo]\nsource=Default\nvalue=modified\n")
+    config = Config(config_spec=ConfigSpec, env_var="SOURCE_SPEC_PATH")
+    assert config.foo == "modified"
+    assert len(parses) == 2
+
+
+def test_compiled_source_spec_file(environ, random_string, tmp_path):
+    environ["VALUE"] = str(random_string)
+    spec_path = tmp_path / "spec.yaml"
+    spec_path.write_text(
+        dedent(
+            """
+        parameters:
+          foo:
+            source: Env
+            path: VALUE
+            description: not a source argument
+        """
+        )
+    )
+    compiled_path = tmp_path / "spec.json"
+    config_module.write_compiled_source_spec(str(spec_path), str(compiled_path))
+    environ["SOURCE_SPEC_PATH"] = str(compiled_path)
+
+    class ConfigSpec(Spec):
+        foo: str
+
+    config = Config(config_spec=ConfigSpec, env_var="SOURCE_SPEC_PATH")
+
+    assert config.foo == random_string
+    assert "description" not in compiled_path.read_text()
+
+
 # Test composing multiple source specs
 def test_multiple_source_specs(environ, random_string, random_integer):
     environ["VALUE"] = random_string
@@ -148,6 +253,144 @@ def test_source_spec_from_multiple_ini_file(environ, random_string, random_integ
 
 
 # Test parameter access behaviour
+def test_reads_use_compiled_resolution_plan(monkeypatch, random_string):
+    class ConfigSpec(Spec):
+        foo: str
+
+    class SourceSpec1:
+        foo = Default(random_string)
+
+    class SourceSpec2:
+        foo = Default("Should not be read!")
+
+    config = Config(config_spec=ConfigSpec, source_spec=(SourceSpec1, SourceSpec2))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("source specs resolved on read")
+
+    monkeypatch.setattr(Config, "_source_specs", fail)
+
+    assert config.foo == random_string
+    assert config["foo"] == random_string
+    assert config.get("foo") == random_string
+
+
+def test_falls_through_sources_without_value(environ, random_string):
+    class ConfigSpec(Spec):
+        foo: str
+        bar: str
+
+    class SourceSpec1:
+        foo = Env(path="NOT_SET_FOO")
+        bar = Env(path="NOT_SET_BAR")
+
+    class SourceSpec2:
+        foo = RemoteSource("foo")
+
+    class SourceSpec3:
+        foo = Default(random_string)
+
+    config = Config(
+        config_spec=ConfigSpec, source_spec=(SourceSpec1, SourceSpec2, SourceSpec3)
+    )
+
+    assert config.foo == random_string
+    assert config.bar is NOTHING
+    assert config.get("bar", "default") == "default"
+
+
+def test_prefer_local_sources(environ, random_string):
+    environ["FOO"] = random_string
+
+    class ConfigSpec(Spec):
+        foo: str
+        bar: str
+
+    remote_foo = RemoteSource("foo", "remote")
+    remote_bar = RemoteSource("bar", "remote")
+
+    class SourceSpec1:
+        foo = remote_foo
+        bar = remote_bar
+
+    class SourceSpec2:
+        foo = Env(path="FOO")
+        bar = Env(path="NOT_SET_BAR")
+
+    source_specs = (SourceSpec1, SourceSpec2)
+    assert Config(config_spec=ConfigSpec, source_spec=source_specs).foo == "remote"
+    remote_foo.reads = 0
+
+    config = Config(config_spec=ConfigSpec, source_spec=source_specs, prefer_local=True)
+
+    assert config.foo == random_string
+    assert remote_foo.reads == 0
+    assert config.bar == "remote"
+    assert [type(s) for s in config._plan("foo").sources] == [Env, RemoteSource]
+
+
+def test_prefer_local_falls_back_to_defaults(environ, random_string):
+    environ["FOO"] = random_string
+
+    class ConfigSpec(Spec):
+        foo: str
+        bar: str
+        baz: str
+
+    class SourceSpec1:
+        foo = Default("default")
+        bar = Default("default")
+        baz = "default"
+
+    class SourceSpec2:
+        foo = Env(path="FOO")
+        bar = RemoteSource("bar", "remote")
+        baz = RemoteSource("baz", "remote")
+
+    config = Config(
+        config_spec=ConfigSpec,
+        source_spec=(SourceSpec1, SourceSpec2),
+        prefer_local=True,
+    )
+
+    assert config.foo == random_string
+    assert config.bar == "remote"
+    assert config.baz == "remote"
+    assert [type(s) for s in config._plan("bar").sources] == [RemoteSource, Default]
+
+
+def test_remember_layer(random_string):
+    class ConfigSpec(Spec):
+        foo: str
+
+    remote = RemoteSource("foo")
+    local = RemoteSource("foo", random_string)
+
+    class SourceSpec1:
+        foo = remote
+
+    class SourceSpec2:
+        foo = local
+
+    config = Config(
+        config_spec=ConfigSpec,
+        source_spec=(SourceSpec1, SourceSpec2),
+        remember_layer=True,
+    )
+
+    for _ in range(3):
+        assert config.foo == random_string
+    assert remote.reads == 1
+
+    # Falls through again once the remembered source has no value
+    local._remote_value = NOTHING
+    remote._remote_value = "remote"
+    config._composed_source_spec.__source_cache__.clear()
+    assert config.foo == "remote"
+    assert config.foo == "remote"
+    assert remote.reads == 2
+
+
 def test_accessing_non_existant_config_parameter(random_integer):
     class ConfigSpec(Spec):
         foo: str
@@ -193,6 +436,63 @@ def test_casts_source_value_to_type(environ, random_integer):
     assert config.bar == random_integer
 
 
+def test_converted_values_are_cached(random_string):
+    calls = []
+
+    class Counted(String):
+        def factory_type(self, value):
+            calls.append(value)
+            return value
+
+    class ConfigSpec(Spec):
+        foo = Counted()
+
+    class SourceSpec:
+        foo = Default(value=random_string)
+
+    config = Config(config_spec=ConfigSpec, source_spec=SourceSpec)
+
+    assert config.foo == random_string
+    assert config["foo"] == random_string
+    assert config.get("foo") == random_string
+    assert calls == [random_string]
+
+
+def test_converted_values_follow_source_refresh(random_string, random_integer):
+    control = {"time": 0.0}
+    calls = []
+
+    class Counted(String):
+        def factory_type(self, value):
+            calls.append(value)
+            return value
+
+    tempfile = NamedTemporaryFile(prefix=".env")
+    with open(tempfile.name, "w") as fh:
+        fh.write(f"FOO={random_string}\n")
+
+    class ConfigSpec(Spec):
+        foo = Counted()
+
+    class SourceSpec:
+        foo = files.DotEnvFile(
+            path="FOO", dotenv_path=tempfile.name, _get_time=lambda: control["time"]
+        )
+
+    config = Config(config_spec=ConfigSpec, source_spec=SourceSpec)
+
+    assert config.foo == random_string
+    assert config.foo == random_string
+
+    with open(tempfile.name, "w") as fh:
+        fh.write(f"FOO={random_integer}\n")
+    control["time"] = 60.0
+
+    assert config.foo == str(random_integer)
+    assert config.foo == str(random_integer)
+    assert calls == [random_string, str(random_integer)]
+
+
 def test_string_parameter_type(environ, random_string):
     environ["FOO"] = random_string
     environ["BAR"] = random_string
@@ -346,6 +646,81 @@ def test_failed_preloading(environ):
         preload(config)
 
 
+def test_preload_fetches_concurrently():
+    names = [f"param_{i}" for i in range(10)]
+    ConfigSpec = type(
+        "ConfigSpec", (Spec,), {"__annotations__": dict((n, str) for n in names)}
+    )
+    SourceSpec = type("SourceSpec", (), dict((n, SlowSource(n, 0.2)) for n in names))
+
+    config = Config(config_spec=ConfigSpec, source_spec=SourceSpec)
+
+    start = time.monotonic()
+    results = preload(config)
+    elapsed = time.monotonic() - start
+
+    # scales with the slowest source rather than the sum of all sources
+    assert elapsed < 1.0
+    assert [result.name for result in results] == names
+    assert [result.value for result in results] == names
+    assert all(result.error is None for result in results)
+    assert all(result.elapsed >= 0.2 for result in results)
+
+
+def test_preload_reports_failures_together(environ):
+    try:
+        del environ["FOO"]
+    except KeyError:
+        pass
+
+    class ConfigSpec(Spec):
+        foo: str
+        bar: str
+        baz: str
+
+    class SourceSpec:
+        foo = Default(value="FOO")
+        bar = Env(path="FOO")
+        baz = SlowSource("baz", 1)
+
+    config = Config(config_spec=ConfigSpec, source_spec=SourceSpec)
+
+    start = time.monotonic()
+    with pytest.raises(PreloadError) as excinfo:
+        preload(config, timeout=0.2)
+    assert time.monotonic() - start < 1.0
+
+    errors = dict((result.name, result.error) for result in excinfo.value.results)
+    assert errors == {"foo": None, "bar": "no value", "baz": "timed out"}
+
+
+def test_preload_cancels_queued_fetches():
+    names = [f"param_{i}" for i in range(4)]
+    ConfigSpec = type(
+        "ConfigSpec", (Spec,), {"__annotations__": dict((n, str) for n in names)}
+    )
+    reads = []
+
+    class CountedSource(SlowSource):
+        @property
+        def _value(self):
+            reads.append(self._path)
+            return super()._value
+
+    SourceSpec = type("SourceSpec", (), dict((n, CountedSource(n, 0.2)) for n in names))
+
+    config = Config(config_spec=ConfigSpec, source_spec=SourceSpec)
+
+    with pytest.raises(PreloadError) as excinfo:
+        preload(config, max_workers=1, timeout=0.1)
+    time.sleep(0.5)
+
+    # Only the fetch running when the timeout passed was made
+    assert reads == ["param_0"]
+    errors = [result.error for result in excinfo.value.results]
+    assert errors == ["timed out"] * 4
+
+
 def test_failed_runtime(environ):
     """When a source fails at runtime the last fetched value should be kept."""
     environ["FOO"] = "FOO"
@@ -0,0 +1,59 @@
+import subprocess
+import sys
+
+# Generous bound on the cumulative import time of config_composer.core, in
+# microseconds. Importing the backends eagerly took over 200ms.
+IMPORT_BUDGET_US = 150_000
+
+BACKEND_MODULES = ("boto3", "botocore", "hvac", "requests", "yaml", "dotenv", "asyncio")
+
+
+def import_times(statement):
+    """Cumulative import time, in microseconds, of each module imported."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_core_does_not_import_backends():
+    times = import_times("import config_composer.core")
+
+    imported = [name for name in times if name.split(".")[0] in BACKEND_MODULES]
+    assert imported == []
+    assert times["config_composer.core"] < IMPORT_BUDGET_US
+
+
+def imported_modules(statement):
+    """Modules imported by running statement in a new interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-c", statement + "; import sys; print(*sys.modules)"],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    return set(result.stdout.split())
+
+
+def test_sources_are_imported_when_used():
+    # -X importtime does not report modules loaded by importlib.import_module
+    modules = imported_modules(
+        "from config_composer.sources import Env, files; "
+        "from config_composer.core.config import get_source; "
+        "get_source('Parameter')"
+    )
+
+    assert "config_composer.sources.files" in modules
+    assert "config_composer.sources.aws" in modules
+    assert "config_composer.sources.vault" not in modules
+    assert "boto3" not in modules
+    assert "dotenv" not in modules
@@ -0,0 +1,143 @@
+import multiprocessing
+import os
+
+import pytest
+
+from config_composer.consts import NOTHING
+from config_composer.core import Config, ParameterError, Spec
+from config_composer.core.shared import SharedConfig, SnapshotPublisher
+from config_composer.sources.abc import AbstractSourceDescriptor, ValueSource
+
+
+class Backend(ValueSource, AbstractSourceDescriptor):
+    values: dict = {}
+    fetches: list = []
+
+    def __init__(self, path):
+        self._path = path
+
+    @property
+    def _name(self):
+        return self._path
+
+    @property
+    def _key(self):
+        return (type(self).__name__,)
+
+    def __repr__(self):
+        return f"""Backend(path="{self._path}")"""
+
+    @property
+    def _value(self):
+        Backend.fetches.append(self._path)
+        return Backend.values.get(self._path, NOTHING)
+
+
+class ConfigSpec(Spec):
+    host: str
+    port: int
+    missing: str
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    monkeypatch.setattr(Backend, "values", {"host": "db", "port": "5432"})
+    monkeypatch.setattr(Backend, "fetches", [])
+    return Backend
+
+
+@pytest.fixture
+def publisher(backend, tmp_path):
+    class SourceSpec:
+        host = Backend("host")
+        port = Backend("port")
+        missing = Backend("missing")
+
+    config = Config(config_spec=ConfigSpec, source_spec=SourceSpec)
+    publisher = SnapshotPublisher(config, path=str(tmp_path / "config.snapshot"))
+    yield publisher
+    publisher.close()
+
+
+def read_in_worker(path, connection):
+    config = SharedConfig(ConfigSpec, path)
+    connection.send((config.host, config.port, config.generation))
+    # Wait for the master to publish again
+    connection.recv()
+    connection.send((config.host, config.port, config.generation, Backend.fetches))
+
+
+class TestSharedConfig:
+    def test_reads_published_values(self, publisher):
+        publisher.publish()
+        config = SharedConfig(ConfigSpec, publisher.path)
+
+        assert config.host == "db"
+        assert config["port"] == 5432
+        assert config.missing is NOTHING
+        assert config.get("missing", "default") == "default"
+        with pytest.raises(ParameterError):
+            config.undefined
+
+    def test_nothing_published_yet(self, publisher):
+        config = SharedConfig(ConfigSpec, publisher.path)
+
+        assert config.generation == 0
+        assert config.host is NOTHING
+
+    def test_new_generations_are_seen(self, publisher, backend):
+        assert publisher.publish() == 2
+        config = SharedConfig(ConfigSpec, publisher.path)
+        snapshot = config.snapshot()
+        assert config.snapshot() is snapshot
+
+        # Values changed in the master's source cache
+        cache = publisher._config._composed_source_spec.__source_cache__
+        cache[("Backend",)]["host"] = "replica"
+        assert publisher.publish() == 4
+
+        assert config.generation == 4
+        assert config.host == "replica"
+        assert config.snapshot() is not snapshot
+
+    def test_file_grows_with_values(self, backend, tmp_path):
+        backend.values["host"] = "x" * 1000
+
+        class SourceSpec:
+            host = Backend("host")
+            port = Backend("port")
+            missing = Backend("missing")
+
+        config = Config(config_spec=ConfigSpec, source_spec=SourceSpec)
+        publisher = SnapshotPublisher(
+            config, path=str(tmp_path / "config.snapshot"), capacity=16
+        )
+        shared_config = SharedConfig(ConfigSpec, publisher.path)
+        publisher.publish()
+
+        assert shared_config.host == "x" * 1000
+        publisher.close()
+
+    def test_not_a_snapshot(self, tmp_path):
+        path = tmp_path / "config.snapshot"
+        path.write_bytes(b"\0" * 64)
+
+        with pytest.raises(ValueError):
+            SharedConfig(ConfigSpec, str(path))
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+    def test_forked_workers_do_not_fetch(self, publisher, backend):
+        publisher.publish()
+        backend.fetches.clear()
+        context = multiprocessing.get_context("fork")
+        master, worker = context.Pipe()
+        process = context.Process(target=read_in_worker, args=(publisher.path, worker))
+        process.start()
+
+        assert master.recv() == ("db", 5432, 2)
+        cache = publisher._config._composed_source_spec.__source_cache__
+        cache[("Backend",)]["port"] = "6432"
+        publisher.publish()
+        master.send("published")
+        assert master.recv() == ("db", 6432, 4, [])
+        process.join()
@@ -0,0 +1,92 @@
+import pytest
+
+from config_composer.consts import NOTHING
+from config_composer.core import Config, Spec, Integer
+from config_composer.sources import Default, Env
+
+
+def test_snapshot_holds_converted_values(environ, random_string, random_integer):
+    environ["FOO"] = random_string
+    environ["BAR"] = str(random_integer)
+
+    class ConfigSpec(Spec):
+        foo: str
+        bar = Integer()
+
+    class SourceSpec:
+        foo = Env(path="FOO")
+        bar = Env(path="BAR")
+
+    config = Config(config_spec=ConfigSpec, source_spec=SourceSpec)
+    snapshot = config.snapshot()
+
+    assert snapshot.foo == random_string
+    assert snapshot.bar == random_integer
+    assert snapshot._asdict() == {"foo": random_string, "bar": random_integer}
+    assert type(snapshot).__name__ == "ConfigSpecSnapshot"
+    assert type(snapshot).__slots__ == ("foo", "bar")
+    assert not hasattr(snapshot, "__dict__")
+    assert not hasattr(type(snapshot), "__getattr__")
+
+    with pytest.raises(AttributeError):
+        snapshot.baz
+
+
+def test_snapshot_is_immutable(random_string):
+    class ConfigSpec(Spec):
+        foo: str
+
+    class SourceSpec:
+        foo = Default(random_string)
+
+    snapshot = Config(config_spec=ConfigSpec, source_spec=SourceSpec).snapshot()
+
+    with pytest.raises(AttributeError):
+        snapshot.foo = "bar"
+    with pytest.raises(AttributeError):
+        del snapshot.foo
+    with pytest.raises(AttributeError):
+        snapshot.bar = "bar"
+    assert snapshot.foo == random_string
+
+
+def test_refresh_swaps_snapshot(environ, random_string, random_integer):
+    environ["FOO"] = random_string
+
+    class ConfigSpec(Spec):
+        foo: str
+
+    class SourceSpec:
+        foo = Env(path="FOO")
+
+    config = Config(config_spec=ConfigSpec, source_spec=SourceSpec)
+    snapshot = config.snapshot()
+    assert config.snapshot() is snapshot
+
+    # Replace the cached source value, as a source refresh would
+    source_spec = config.__dict__["_Config__source_spec"]
+    source_spec.__source_cache__[("Env",)]["FOO"] = str(random_integer)
+
+    new_snapshot = config.refresh_snapshot()
+
+    assert config.snapshot() is new_snapshot
+    assert new_snapshot.foo == str(random_integer)
+    # readers holding the old snapshot keep a consistent view
+    assert snapshot.foo == random_string
+
+
+def test_snapshot_missing_values(environ):
+    try:
+        del environ["FOO"]
+    except KeyError:
+        pass
+
+    class ConfigSpec(Spec):
+        foo: str
+
+    class SourceSpec:
+        foo = Env(path="FOO")
+
+    snapshot = Config(config_spec=ConfigSpec, source_spec=SourceSpec).snapshot()
+
+    assert snapshot.foo is NOTHING
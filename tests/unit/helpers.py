@@ -0,0 +1,19 @@
+import time
+
+
+class Clock:
+    """Stands in for time.monotonic, advanced by setting now."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def wait_for(predicate, timeout=2.0):
+    """Polls predicate until it holds, or timeout seconds pass."""
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
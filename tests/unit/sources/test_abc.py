@@ -1,3 +1,8 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+from config_composer.consts import NOTHING
 from config_composer.core import Config, Spec
 from config_composer.sources.abc import (
     AbstractSourceDescriptor,
@@ -5,6 +10,7 @@ from config_composer.sources.abc import (
     DocumentSource,
     DocumentSourceTTL,
 )
+from tests.unit.helpers import Clock
 
 
 class TestValueSource:
@@ -307,3 +313,224 @@ class TestDocumentSourceTTL:
                 "baz": f"baz - {random_string} - 2",
             }
         }
+
+
+class TestSingleFlight:
+    threads = 64
+
+    def read_concurrently(self, descriptor, MockClass):
+        barrier = threading.Barrier(self.threads)
+
+        def read(_):
+            barrier.wait()
+            try:
+                return descriptor.__get__(None, MockClass)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            return list(executor.map(read, range(self.threads)))
+
+    def make_source(self, base, result):
+        calls = []
+
+        class MySource(base, AbstractSourceDescriptor):
+            @property
+            def _name(self):
+                return "foo"
+
+            @property
+            def _key(self):
+                return (type(self).__name__,)
+
+            def __repr__(self):
+                return "MySource()"
+
+            def fetch(self):
+                calls.append(None)
+                time.sleep(0.1)
+                if isinstance(result, Exception):
+                    raise result
+                return result
+
+            _value = property(fetch)
+            _doc = property(lambda self: {"foo": self.fetch()})
+
+        return MySource(), calls
+
+    def test_value_source_fetches_once(self, random_string):
+        class MockClass(object):
+            pass
+
+        source, calls = self.make_source(ValueSource, random_string)
+
+        assert self.read_concurrently(source, MockClass) == [
+            random_string
+        ] * self.threads
+        assert len(calls) == 1
+
+    def test_document_source_fetches_once(self, random_string):
+        class MockClass(object):
+            pass
+
+        source, calls = self.make_source(DocumentSource, random_string)
+
+        assert self.read_concurrently(source, MockClass) == [
+            random_string
+        ] * self.threads
+        assert len(calls) == 1
+
+    def test_shares_nothing(self):
+        class MockClass(object):
+            pass
+
+        source, calls = self.make_source(ValueSource, NOTHING)
+
+        assert self.read_concurrently(source, MockClass) == [NOTHING] * self.threads
+        assert len(calls) == 1
+
+    def test_shares_exceptions(self):
+        class MockClass(object):
+            pass
+
+        error = ConnectionError("backend down")
+        source, calls = self.make_source(ValueSource, error)
+
+        assert self.read_concurrently(source, MockClass) == [error] * self.threads
+        assert len(calls) == 1
+
+    def test_concurrent_first_reads_share_a_cache(self):
+        class MockClass(object):
+            pass
+
+        source, _ = self.make_source(ValueSource, "foo")
+        barrier = threading.Barrier(self.threads)
+
+        def get_cache(_):
+            barrier.wait()
+            return source._get_cache(None, MockClass)
+
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            caches = list(executor.map(get_cache, range(self.threads)))
+
+        assert all(cache is caches[0] for cache in caches)
+
+    def test_value_not_fetched_by_a_shared_flight(self):
+        class MockClass(object):
+            pass
+
+        foo, foo_calls = self.make_source(ValueSource, "foo")
+        bar, bar_calls = self.make_source(ValueSource, NOTHING)
+        type(bar)._name = "bar"
+        # Each fetches only its own value, while sharing a flight
+        for source in (foo, bar):
+            type(source)._flight_key = lambda self, cache: (id(cache),)
+        barrier = threading.Barrier(2)
+
+        def read(source):
+            barrier.wait()
+            return source.__get__(None, MockClass)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            assert list(executor.map(read, (foo, bar))) == ["foo", NOTHING]
+
+        assert len(foo_calls) == 1
+        assert len(bar_calls) == 1
+
+
+class TestNegativeCache:
+    class MyValueSource(ValueSource, AbstractSourceDescriptor):
+        def __init__(self, path, values, negative_ttl, clock):
+            self._path = path
+            self._values = values
+            self._negative_ttl = negative_ttl
+            self._get_time = clock
+            self.fetches = 0
+
+        @property
+        def _name(self):
+            return self._path
+
+        @property
+        def _key(self):
+            return (type(self).__name__,)
+
+        def __repr__(self):
+            return f"""MyValueSource(path="{self._path}")"""
+
+        @property
+        def _value(self):
+            self.fetches += 1
+            return self._values.get(self._path, NOTHING)
+
+    class MyDocumentSource(DocumentSource, AbstractSourceDescriptor):
+        def __init__(self, path, doc, negative_ttl, clock):
+            self._path = path
+            self.doc = doc
+            self._negative_ttl = negative_ttl
+            self._get_time = clock
+            self.loads = 0
+
+        @property
+        def _name(self):
+            return self._path
+
+        @property
+        def _key(self):
+            return (type(self).__name__,)
+
+        def __repr__(self):
+            return f"""MyDocumentSource(path="{self._path}")"""
+
+        @property
+        def _doc(self):
+            self.loads += 1
+            return dict(self.doc)
+
+    def test_value_source_remembers_missing_values(self):
+        class SourceSpec:
+            pass
+
+        clock = Clock(now=0.0)
+        values: dict = {}
+        source = self.MyValueSource("foo", values, negative_ttl=30, clock=clock)
+
+        assert source.__get__(None, SourceSpec) is NOTHING
+        clock.now = 29
+        values["foo"] = "bar"
+        assert source.__get__(None, SourceSpec) is NOTHING
+        assert source.fetches == 1
+
+        clock.now = 31
+        assert source.__get__(None, SourceSpec) == "bar"
+        assert source.fetches == 2
+
+    def test_value_source_without_negative_ttl(self):
+        class SourceSpec:
+            pass
+
+        source = self.MyValueSource("foo", {}, negative_ttl=0, clock=Clock(now=0.0))
+
+        for _ in range(3):
+            assert source.__get__(None, SourceSpec) is NOTHING
+        assert source.fetches == 3
+        assert not hasattr(SourceSpec, "__source_missing__")
+
+    def test_document_source_remembers_missing_names(self):
+        class SourceSpec:
+            pass
+
+        clock = Clock(now=0.0)
+        doc = {"foo": "bar"}
+        found = self.MyDocumentSource("foo", doc, negative_ttl=30, clock=clock)
+        missing = self.MyDocumentSource("missing", doc, negative_ttl=30, clock=clock)
+
+        assert found.__get__(None, SourceSpec) == "bar"
+        for _ in range(3):
+            assert missing.__get__(None, SourceSpec) is NOTHING
+        assert found.loads + missing.loads == 2
+
+        clock.now = 31
+        missing.doc["missing"] = "found"
+        assert missing.__get__(None, SourceSpec) == "found"
+        assert found.loads + missing.loads == 3
@@ -1,7 +1,32 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+
 from config_composer.sources import aws
 from config_composer.consts import NOTHING
 
 
+@pytest.fixture
+def ssm_calls(monkeypatch):
+    calls = []
+    client = boto3.session.Session.client
+
+    def counted_client(*args, **kwargs):
+        ssm = client(*args, **kwargs)
+        ssm.meta.events.register(
+            "provide-client-params.ssm.*",
+            lambda model, params, **kwargs: calls.append((model.name, params)),
+        )
+        return ssm
+
+    monkeypatch.setattr(aws, "_clients", {})
+    monkeypatch.setattr(boto3.session.Session, "client", counted_client)
+    yield calls
+
+
 class TestParameterSource:
     def assert_descriptor_value(self, descriptor, expected_value):
         class MockClass(object):
@@ -21,3 +46,218 @@ class TestParameterSource:
         field = aws.Parameter(path="/im/not/here")
 
         self.assert_descriptor_value(field, NOTHING)
+
+    def test_batches_source_spec_parameters(self, aws_parameter_fixtures, ssm_calls):
+        client = boto3.client("ssm")
+        for i in range(25):
+            client.put_parameter(Name=f"/batch/{i}", Value=str(i), Type="String")
+        ssm_calls.clear()
+
+        SourceSpec = type(
+            "SourceSpec",
+            (),
+            dict(
+                [(f"param_{i}", aws.Parameter(path=f"/batch/{i}")) for i in range(25)]
+                + [("missing", aws.Parameter(path="/im/not/here"))]
+            ),
+        )
+
+        assert SourceSpec.param_3 == "3"
+        assert [name for name, _ in ssm_calls] == ["GetParameters"] * 3
+        assert all(len(params["Names"]) <= 10 for _, params in ssm_calls)
+        assert all(params["WithDecryption"] for _, params in ssm_calls)
+
+        cache = SourceSpec.__source_cache__[("Parameter", None, None, None)]
+        assert len(cache) == 26
+        assert cache["/im/not/here"] is NOTHING
+
+        values = [getattr(SourceSpec, f"param_{i}") for i in range(25)]
+        assert values == [str(i) for i in range(25)]
+        assert len(ssm_calls) == 3
+
+    def test_concurrent_reads_share_batches(self, aws_parameter_fixtures, ssm_calls):
+        client = boto3.client("ssm")
+        for i in range(30):
+            client.put_parameter(Name=f"/batch/{i}", Value=str(i), Type="String")
+        ssm_calls.clear()
+
+        SourceSpec = type(
+            "SourceSpec",
+            (),
+            dict((f"param_{i}", aws.Parameter(path=f"/batch/{i}")) for i in range(30)),
+        )
+        barrier = threading.Barrier(16)
+
+        def read(thread):
+            barrier.wait()
+            # Each thread starts from a different parameter
+            names = [f"param_{(thread + i) % 30}" for i in range(30)]
+            return dict((name, getattr(SourceSpec, name)) for name in names)
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            for values in executor.map(read, range(16)):
+                assert values == dict((f"param_{i}", str(i)) for i in range(30))
+
+        assert [name for name, _ in ssm_calls] == ["GetParameters"] * 3
+
+    def test_missing_parameters_are_not_fetched_again(
+        self, aws_parameter_fixtures, ssm_calls
+    ):
+        class SourceSpec:
+            found = aws.Parameter(path="/foo/bar/baz")
+            missing = aws.Parameter(path="/im/not/here")
+            uncached = aws.Parameter(path="/im/not/here/either", negative_ttl=0)
+
+        assert SourceSpec.found == aws_parameter_fixtures
+        calls = len(ssm_calls)
+
+        for _ in range(3):
+            assert SourceSpec.missing is NOTHING
+        assert len(ssm_calls) == calls
+
+        for _ in range(3):
+            assert SourceSpec.uncached is NOTHING
+        assert len(ssm_calls) == calls + 3
+
+    def test_version_and_label_selectors(self, aws_parameter_fixtures, ssm_calls):
+        client = boto3.client("ssm")
+        client.put_parameter(Name="/a/ver", Value="v1", Type="String")
+        client.put_parameter(Name="/a/ver", Value="v2", Type="String", Overwrite=True)
+        client.label_parameter_version(
+            Name="/a/ver", ParameterVersion=1, Labels=["old"]
+        )
+        ssm_calls.clear()
+
+        class SourceSpec:
+            latest = aws.Parameter(path="/a/ver")
+            version = aws.Parameter(path="/a/ver:1")
+            label = aws.Parameter(path="/a/ver:old")
+
+        assert SourceSpec.version == "v1"
+        assert SourceSpec.label == "v1"
+        assert SourceSpec.latest == "v2"
+        assert [name for name, _ in ssm_calls] == [
+            "GetParameters",
+            "GetParameter",
+            "GetParameter",
+        ]
+
+    def test_failed_batch_is_fetched_by_name(self, monkeypatch):
+        monkeypatch.setattr(aws, "_clients", {})
+        session = boto3.session.Session(
+            aws_access_key_id="testing",
+            aws_secret_access_key="testing",
+            region_name="us-east-1",
+        )
+        client = session.client("ssm")
+        stubber = Stubber(client)
+        stubber.add_client_error("get_parameters", "AccessDeniedException", "", 400)
+        stubber.add_response(
+            "get_parameter", {"Parameter": {"Name": "/foo", "Value": "foo"}}
+        )
+        stubber.add_client_error("get_parameter", "AccessDeniedException", "", 400)
+        stubber.add_response(
+            "get_parameter", {"Parameter": {"Name": "/baz", "Value": "baz"}}
+        )
+        session_stub = type("Session", (), {"client": lambda self, *a, **kw: client})()
+
+        class SourceSpec:
+            foo = aws.Parameter(path="/foo", session=session_stub)
+            secret = aws.Parameter(path="/secret", session=session_stub)
+            baz = aws.Parameter(path="/baz", session=session_stub)
+
+        with stubber:
+            assert SourceSpec.foo == "foo"
+            assert SourceSpec.secret is NOTHING
+            assert SourceSpec.baz == "baz"
+            stubber.assert_no_pending_responses()
+
+    def test_reuses_pooled_clients(self, aws_parameter_fixtures, monkeypatch):
+        monkeypatch.setattr(aws, "_clients", {})
+        created = []
+        client = boto3.session.Session.client
+
+        def counted_client(*args, **kwargs):
+            created.append(kwargs)
+            return client(*args, **kwargs)
+
+        monkeypatch.setattr(boto3.session.Session, "client", counted_client)
+
+        class MockClass(object):
+            pass
+
+        for _ in range(3):
+            field = aws.Parameter(path="/foo/bar/baz")
+            assert field.__get__(None, MockClass) == aws_parameter_fixtures
+            MockClass.__source_cache__.clear()
+        assert len(created) == 1
+
+        field = aws.Parameter(path="/foo/bar/baz", region="eu-west-1")
+        assert field.__get__(None, MockClass) is NOTHING
+        assert created[-1]["region_name"] == "eu-west-1"
+        assert len(created) == 2
+
+        assert aws.get_client() is aws.get_client()
+        aws._reset_clients()
+        assert aws._clients == {}
+
+
+class TestParameterPathSource:
+    def assert_descriptor_value(self, descriptor, expected_value, MockClass):
+        value = descriptor.__get__(None, MockClass)
+        assert value == expected_value
+
+    def test_loads_hierarchy(self, aws_parameter_fixtures, ssm_calls):
+        client = boto3.client("ssm")
+        for i in range(25):
+            client.put_parameter(
+                Name=f"/svc/prod/db/{i}", Value=str(i), Type="SecureString"
+            )
+        client.put_parameter(Name="/svc/prod/host", Value="localhost", Type="String")
+        client.put_parameter(Name="/svc/test/host", Value="nope", Type="String")
+        ssm_calls.clear()
+
+        class MockClass(object):
+            pass
+
+        host = aws.ParameterPath(prefix="/svc/prod", path="host")
+        self.assert_descriptor_value(host, "localhost", MockClass)
+        calls = len(ssm_calls)
+        assert calls >= 3
+        assert set(name for name, _ in ssm_calls) == {"GetParametersByPath"}
+        assert all(params["Recursive"] for _, params in ssm_calls)
+
+        for i in range(25):
+            field = aws.ParameterPath(prefix="/svc/prod/", path=f"db/{i}")
+            self.assert_descriptor_value(field, str(i), MockClass)
+        assert len(ssm_calls) == calls
+
+        missing = aws.ParameterPath(prefix="/svc/prod", path="im/not/here")
+        self.assert_descriptor_value(missing, NOTHING, MockClass)
+
+    def test_reloads_after_ttl(self, aws_parameter_fixtures):
+        control = {"time": 0.0}
+
+        class MockClass(object):
+            pass
+
+        def mock_time():
+            return control["time"]
+
+        client = boto3.client("ssm")
+        client.put_parameter(Name="/svc/prod/host", Value="one", Type="String")
+
+        host = aws.ParameterPath(prefix="/svc/prod", path="host", _get_time=mock_time)
+        self.assert_descriptor_value(host, "one", MockClass)
+
+        client.put_parameter(
+            Name="/svc/prod/host", Value="two", Type="String", Overwrite=True
+        )
+
+        # ttl has not expired and hence cache is used
+        self.assert_descriptor_value(host, "one", MockClass)
+
+        # time passes ttl
+        control["time"] = 60.0
+
+        self.assert_descriptor_value(host, "two", MockClass)
@@ -0,0 +1,264 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import boto3
+import pytest
+from cryptography.fernet import Fernet
+
+from config_composer.consts import NOTHING
+from config_composer.sources import aws
+from config_composer.sources.abc import (
+    AbstractSourceDescriptor,
+    ValueSource,
+    DocumentSource,
+    DocumentSourceTTL,
+)
+from config_composer.sources.disk_cache import DiskCache
+from tests.unit.helpers import Clock, wait_for
+
+
+@pytest.fixture
+def key(monkeypatch):
+    key = Fernet.generate_key().decode()
+    monkeypatch.setenv("CONFIG_COMPOSER_CACHE_KEY", key)
+    return key
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "config.cache")
+
+
+class Backend:
+    def __init__(self, values, blocked=False):
+        self.values = values
+        self.fetches = []
+        # Fetches wait until released
+        self.released = threading.Event()
+        if not blocked:
+            self.released.set()
+
+    def fetch(self, name):
+        self.released.wait(timeout=2)
+        self.fetches.append(name)
+
+
+class RemoteValue(ValueSource, AbstractSourceDescriptor):
+    _persistent = True
+
+    def __init__(self, path, backend):
+        self._path = path
+        self.backend = backend
+
+    @property
+    def _name(self):
+        return self._path
+
+    @property
+    def _key(self):
+        return ("RemoteValue",)
+
+    def __repr__(self):
+        return f"""RemoteValue(path="{self._path}")"""
+
+    @property
+    def _value(self):
+        self.backend.fetch(self._path)
+        return self.backend.values.get(self._path, NOTHING)
+
+
+class RemoteDocument(DocumentSource, DocumentSourceTTL, AbstractSourceDescriptor):
+    _persistent = True
+
+    def __init__(self, path, backend):
+        self._path = path
+        self.backend = backend
+
+    @property
+    def _name(self):
+        return self._path
+
+    @property
+    def _key(self):
+        return ("RemoteDocument",)
+
+    def __repr__(self):
+        return f"""RemoteDocument(path="{self._path}")"""
+
+    def _expired(self, ttl_stamp):
+        if ttl_stamp is None:
+            return True, {}
+        return False, ttl_stamp
+
+    @property
+    def _doc(self):
+        self.backend.fetch("doc")
+        return dict(self.backend.values)
+
+
+def make_spec(disk_cache, **sources):
+    return type("SourceSpec", (), dict(sources, __disk_cache__=disk_cache))
+
+
+class TestDiskCache:
+    def test_values_are_encrypted(self, key, cache_path):
+        disk_cache = DiskCache(cache_path)
+        disk_cache.store({("Secret", "db"): {"password": "hunter2"}})
+
+        with open(cache_path, "rb") as f:
+            assert b"hunter2" not in f.read()
+        assert DiskCache(cache_path).load(("Secret", "db")) == {"password": "hunter2"}
+
+    def test_entries_expire_after_max_age(self, key, cache_path):
+        clock = Clock()
+        DiskCache(cache_path, max_age=60, _get_time=clock).store(
+            {("Secret", "db"): {"password": "hunter2"}}
+        )
+
+        clock.now += 60
+        assert DiskCache(cache_path, _get_time=clock).load(("Secret", "db"))
+        clock.now += 1
+        assert DiskCache(cache_path, _get_time=clock).load(("Secret", "db")) is None
+
+    def test_other_keys_cannot_read_the_file(self, key, cache_path):
+        DiskCache(cache_path).store({("Secret", "db"): {"password": "hunter2"}})
+
+        disk_cache = DiskCache(cache_path, key=Fernet.generate_key())
+        assert disk_cache.load(("Secret", "db")) is None
+
+    def test_disabled_without_key(self, monkeypatch, cache_path):
+        monkeypatch.delenv("CONFIG_COMPOSER_CACHE_KEY", raising=False)
+        disk_cache = DiskCache(cache_path)
+        disk_cache.store({("Secret", "db"): {"password": "hunter2"}})
+
+        assert not disk_cache.enabled
+        assert disk_cache.load(("Secret", "db")) is None
+
+
+class TestWarmRestart:
+    def test_value_source_served_from_disk_then_revalidated(self, key, cache_path):
+        backend = Backend({"foo": "old", "bar": "bar"})
+        SourceSpec = make_spec(DiskCache(cache_path), foo=RemoteValue("foo", backend))
+        assert SourceSpec.foo == "old"
+
+        # Restarted process, with a value changed since
+        backend = Backend({"foo": "new"}, blocked=True)
+        SourceSpec = make_spec(DiskCache(cache_path), foo=RemoteValue("foo", backend))
+
+        assert SourceSpec.foo == "old"
+        backend.released.set()
+        assert wait_for(lambda: SourceSpec.foo == "new")
+        assert backend.fetches == ["foo"]
+
+    def test_missing_values_keep_being_served_from_disk(self, key, cache_path):
+        backend = Backend({"foo": "old"})
+        SourceSpec = make_spec(DiskCache(cache_path), foo=RemoteValue("foo", backend))
+        assert SourceSpec.foo == "old"
+
+        backend = Backend({})
+        SourceSpec = make_spec(DiskCache(cache_path), foo=RemoteValue("foo", backend))
+
+        assert SourceSpec.foo == "old"
+        assert wait_for(lambda: backend.fetches == ["foo"])
+        assert SourceSpec.foo == "old"
+
+    def test_parameters_are_revalidated_in_batches(
+        self, key, cache_path, aws_parameter_fixtures, monkeypatch
+    ):
+        client = boto3.client("ssm")
+        for i in range(30):
+            client.put_parameter(Name=f"/batch/{i}", Value=str(i), Type="String")
+        requested = []
+        ssm_client = boto3.session.Session.client
+
+        def counted_client(*args, **kwargs):
+            ssm = ssm_client(*args, **kwargs)
+            ssm.meta.events.register(
+                "provide-client-params.ssm.GetParameters",
+                lambda params, **kwargs: requested.append(params["Names"]),
+            )
+            return ssm
+
+        monkeypatch.setattr(aws, "_clients", {})
+        monkeypatch.setattr(boto3.session.Session, "client", counted_client)
+
+        def source_spec():
+            parameters = dict(
+                (f"param_{i}", aws.Parameter(path=f"/batch/{i}")) for i in range(30)
+            )
+            return make_spec(DiskCache(cache_path), **parameters)
+
+        SourceSpec = source_spec()
+        for i in range(30):
+            assert getattr(SourceSpec, f"param_{i}") == str(i)
+        assert len(requested) == 3
+        requested.clear()
+
+        # Restarted process, with every parameter served from disk
+        SourceSpec = source_spec()
+        barrier = threading.Barrier(16)
+
+        def read(thread):
+            barrier.wait()
+            return [getattr(SourceSpec, f"param_{i}") for i in range(30)]
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            for values in executor.map(read, range(16)):
+                assert values == [str(i) for i in range(30)]
+
+        assert wait_for(lambda: sum(len(names) for names in requested) >= 30)
+        time.sleep(0.1)
+        names = [name for batch in requested for name in batch]
+        assert sorted(names) == sorted(f"/batch/{i}" for i in range(30))
+        assert len(requested) <= 5
+
+    def test_expired_values_are_fetched_live(self, key, cache_path):
+        clock = Clock()
+        backend = Backend({"foo": "old"})
+        disk_cache = DiskCache(cache_path, max_age=60, _get_time=clock)
+        assert make_spec(disk_cache, foo=RemoteValue("foo", backend)).foo == "old"
+
+        clock.now += 61
+        backend = Backend({"foo": "new"})
+        disk_cache = DiskCache(cache_path, max_age=60, _get_time=clock)
+        SourceSpec = make_spec(disk_cache, foo=RemoteValue("foo", backend))
+
+        assert SourceSpec.foo == "new"
+        assert backend.fetches == ["foo"]
+
+    def test_missing_values_are_not_stored(self, key, cache_path):
+        backend = Backend({})
+        SourceSpec = make_spec(
+            DiskCache(cache_path), missing=RemoteValue("missing", backend)
+        )
+        assert SourceSpec.missing is NOTHING
+
+        assert DiskCache(cache_path).load(("RemoteValue", "missing")) is None
+
+    def test_document_source_served_from_disk(self, key, cache_path):
+        backend = Backend({"foo": "old"})
+        SourceSpec = make_spec(
+            DiskCache(cache_path), foo=RemoteDocument("foo", backend)
+        )
+        assert SourceSpec.foo == "old"
+
+        backend = Backend({"foo": "new"}, blocked=True)
+        SourceSpec = make_spec(
+            DiskCache(cache_path), foo=RemoteDocument("foo", backend)
+        )
+
+        assert SourceSpec.foo == "old"
+        backend.released.set()
+        assert wait_for(lambda: SourceSpec.foo == "new")
+        assert backend.fetches == ["doc"]
+
+    def test_local_sources_are_not_stored(self, key, cache_path):
+        class LocalValue(RemoteValue):
+            _persistent = False
+
+        backend = Backend({"foo": "bar"})
+        SourceSpec = make_spec(DiskCache(cache_path), foo=LocalValue("foo", backend))
+        assert SourceSpec.foo == "bar"
+
+        assert DiskCache(cache_path).load(("RemoteValue", "foo")) is None
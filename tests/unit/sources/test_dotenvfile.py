@@ -1,7 +1,28 @@
 from textwrap import dedent
-from tempfile import NamedTemporaryFile
+from tempfile import NamedTemporaryFile, TemporaryDirectory
+from unittest import mock
+import multiprocessing
+import os
+import time
 
-from config_composer.sources.files import DotEnvFile
+import pytest
+
+from config_composer.sources import refresh
+from config_composer.sources.files import DotEnvFile, refresh_stats
+from config_composer.sources.refresh import RefreshScheduler
+
+
+def read_changes_in_child(foo_field, MockClass, connection):
+    for expected in ("written by child", "written again by child"):
+        with open(foo_field._dotenv_path, "w") as fh:
+            fh.write(f"FOO={expected}\n")
+
+        deadline = time.monotonic() + 2.0
+        value = foo_field.__get__(None, MockClass)
+        while value != expected and time.monotonic() < deadline:
+            time.sleep(0.01)
+            value = foo_field.__get__(None, MockClass)
+        connection.send(value)
 
 
 class TestDotEnvFileSource:
@@ -94,3 +115,122 @@ class TestDotEnvFileSource:
         # ttl expired and hence doc is reloaded
         self.assert_descriptor_value(foo_field, str(random_integer), MockClass)
         self.assert_descriptor_value(bar_field, random_string, MockClass)
+
+    def test_skips_unchanged_file(self, random_string, random_integer):
+        control = {"time": 0.0}
+
+        class MockClass(object):
+            pass
+
+        def mock_time():
+            return control["time"]
+
+        tempfile = NamedTemporaryFile(prefix=".env")
+        with open(tempfile.name, "w") as fh:
+            fh.write(f"FOO={random_string}\n")
+
+        foo_field = DotEnvFile(
+            path="FOO", dotenv_path=tempfile.name, _get_time=mock_time
+        )
+
+        self.assert_descriptor_value(foo_field, random_string, MockClass)
+        assert refresh_stats(tempfile.name) == {"parses": 1, "skips": 0}
+
+        # ttl expires but the file is unchanged
+        for i in range(1, 4):
+            control["time"] = 60.0 * i
+            self.assert_descriptor_value(foo_field, random_string, MockClass)
+        assert refresh_stats(tempfile.name) == {"parses": 1, "skips": 3}
+
+        with open(tempfile.name, "w") as fh:
+            fh.write(f"FOO={random_integer}\n")
+
+        control["time"] = 300.0
+        self.assert_descriptor_value(foo_field, str(random_integer), MockClass)
+        assert refresh_stats(tempfile.name) == {"parses": 2, "skips": 3}
+
+    def test_scheduled_refresh_sees_change_found_by_read(
+        self, random_string, monkeypatch
+    ):
+        control = {"time": 0.0}
+        scheduler = RefreshScheduler()
+        monkeypatch.setattr(refresh, "_scheduler", scheduler)
+
+        class MockClass(object):
+            pass
+
+        tempfile = NamedTemporaryFile(prefix=".env")
+        with open(tempfile.name, "w") as fh:
+            fh.write(f"FOO={random_string}\n")
+
+        foo_field = DotEnvFile(
+            path="FOO", dotenv_path=tempfile.name, _get_time=lambda: control["time"]
+        )
+        self.assert_descriptor_value(foo_field, random_string, MockClass)
+
+        scheduler.start()
+        try:
+            control["time"] = 60.0
+            with open(tempfile.name, "w") as fh:
+                fh.write("FOO=changed value\n")
+
+            # The read defers to the scheduler, and serves the stale value
+            self.assert_descriptor_value(foo_field, random_string, MockClass)
+            assert foo_field._refresh(None, MockClass)
+        finally:
+            scheduler.stop()
+
+        self.assert_descriptor_value(foo_field, "changed value", MockClass)
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+    def test_watched_file_reloads_in_forked_child(self, random_string):
+        class MockClass(object):
+            pass
+
+        with TemporaryDirectory() as directory:
+            dotenv_path = os.path.join(directory, ".env")
+            with open(dotenv_path, "w") as fh:
+                fh.write(f"FOO={random_string}\n")
+
+            foo_field = DotEnvFile(path="FOO", dotenv_path=dotenv_path, watch=True)
+            self.assert_descriptor_value(foo_field, random_string, MockClass)
+
+            context = multiprocessing.get_context("fork")
+            parent, child = context.Pipe()
+            # The child reads through the caches inherited from the parent
+            process = context.Process(
+                target=read_changes_in_child, args=(foo_field, MockClass, child)
+            )
+            process.start()
+
+            # Changed before the child watched the file, then while watched
+            assert parent.recv() == "written by child"
+            assert parent.recv() == "written again by child"
+            process.join()
+
+    def test_watched_file_reloads_on_change(self, random_string, random_integer):
+        class MockClass(object):
+            pass
+
+        with TemporaryDirectory() as directory:
+            dotenv_path = os.path.join(directory, ".env")
+            with open(dotenv_path, "w") as fh:
+                fh.write(f"FOO={random_string}\n")
+
+            foo_field = DotEnvFile(path="FOO", dotenv_path=dotenv_path, watch=True)
+
+            self.assert_descriptor_value(foo_field, random_string, MockClass)
+
+            # reads do not stat the file
+            with mock.patch("os.stat", side_effect=AssertionError):
+                self.assert_descriptor_value(foo_field, random_string, MockClass)
+
+            with open(dotenv_path, "w") as fh:
+                fh.write(f"FOO={random_integer}\n")
+
+            deadline = time.monotonic() + 2.0
+            while time.monotonic() < deadline:
+                if foo_field.__get__(None, MockClass) == str(random_integer):
+                    break
+                time.sleep(0.01)
+            self.assert_descriptor_value(foo_field, str(random_integer), MockClass)
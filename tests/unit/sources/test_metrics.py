@@ -0,0 +1,206 @@
+import pytest
+
+from config_composer.consts import NOTHING
+from config_composer.sources import metrics
+from config_composer.sources.abc import (
+    AbstractSourceDescriptor,
+    ValueSource,
+    DocumentSource,
+    DocumentSourceTTL,
+)
+from config_composer.sources.metrics import (
+    CACHE_HITS,
+    CACHE_MISSES,
+    FETCH_ERRORS,
+    FETCH_SECONDS,
+    NOTHING_RESULTS,
+    REFRESHES,
+    Registry,
+)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = Registry()
+    monkeypatch.setattr(metrics, "_registry", registry)
+    monkeypatch.setattr(metrics, "enabled", True)
+    return registry
+
+
+class MyValueSource(ValueSource, AbstractSourceDescriptor):
+    def __init__(self, path, values):
+        self._path = path
+        self.values = values
+
+    @property
+    def _name(self):
+        return self._path
+
+    @property
+    def _key(self):
+        return ("MyValueSource", None)
+
+    def __repr__(self):
+        return f"""MyValueSource(path="{self._path}")"""
+
+    @property
+    def _value(self):
+        value = self.values[self._path]
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+
+class MyDocumentSource(DocumentSource, DocumentSourceTTL, AbstractSourceDescriptor):
+    def __init__(self, path, doc, ttl=60):
+        self._path = path
+        self._ttl = ttl
+        self.doc = doc
+        self.fail = False
+
+    @property
+    def _name(self):
+        return self._path
+
+    @property
+    def _key(self):
+        return ("MyDocumentSource", "doc")
+
+    def __repr__(self):
+        return f"""MyDocumentSource(path="{self._path}")"""
+
+    def _expired(self, ttl_stamp):
+        if ttl_stamp is None:
+            return True, {}
+        return False, ttl_stamp
+
+    @property
+    def _doc(self):
+        if self.fail:
+            raise ValueError("unavailable")
+        return self.doc
+
+
+class TestSourceMetrics:
+    def test_value_source_hits_and_misses(self, registry):
+        class SourceSpec:
+            pass
+
+        source = MyValueSource("foo", {"foo": "bar"})
+        for _ in range(3):
+            assert source.__get__(None, SourceSpec) == "bar"
+
+        labels = dict(source="MyValueSource", key="MyValueSource")
+        assert registry.counter(CACHE_MISSES, **labels) == 1
+        assert registry.counter(CACHE_HITS, **labels) == 2
+        assert registry.histogram(FETCH_SECONDS, **labels)["count"] == 1
+
+    def test_value_source_nothing_and_errors(self, registry):
+        class SourceSpec:
+            pass
+
+        missing = MyValueSource("missing", {"missing": NOTHING})
+        assert missing.__get__(None, SourceSpec) is NOTHING
+        failing = MyValueSource("failing", {"failing": ValueError("unavailable")})
+        with pytest.raises(ValueError):
+            failing.__get__(None, SourceSpec)
+
+        labels = dict(source="MyValueSource", key="MyValueSource")
+        assert registry.counter(NOTHING_RESULTS, **labels) == 1
+        assert registry.counter(FETCH_ERRORS, **labels) == 1
+        assert registry.histogram(FETCH_SECONDS, **labels)["count"] == 2
+
+    def test_document_source_metrics(self, registry):
+        class SourceSpec:
+            pass
+
+        source = MyDocumentSource("foo", {"foo": "bar"})
+        missing = MyDocumentSource("missing", {"foo": "bar"})
+        assert source.__get__(None, SourceSpec) == "bar"
+        assert source.__get__(None, SourceSpec) == "bar"
+        assert missing.__get__(None, SourceSpec) is NOTHING
+
+        labels = dict(source="MyDocumentSource", key="MyDocumentSource:doc")
+        assert registry.counter(CACHE_HITS, **labels) == 1
+        assert registry.counter(CACHE_MISSES, **labels) == 2
+        assert registry.counter(NOTHING_RESULTS, **labels) == 1
+        # Missing names reload the document
+        assert registry.histogram(FETCH_SECONDS, **labels)["count"] == 2
+
+    def test_refresh_outcomes(self, registry):
+        class SourceSpec:
+            pass
+
+        source = MyDocumentSource("foo", {"foo": "bar"})
+        source.__get__(None, SourceSpec)
+        assert source._refresh(None, SourceSpec)
+        source.fail = True
+        assert not source._refresh(None, SourceSpec)
+
+        labels = dict(source="MyDocumentSource", key="MyDocumentSource:doc")
+        assert registry.counter(REFRESHES, outcome="success", **labels) == 1
+        assert registry.counter(REFRESHES, outcome="error", **labels) == 1
+        assert registry.counter(FETCH_ERRORS, **labels) == 1
+
+    def test_disabled_records_nothing(self, registry, monkeypatch):
+        monkeypatch.setattr(metrics, "enabled", False)
+
+        class SourceSpec:
+            pass
+
+        source = MyValueSource("foo", {"foo": "bar"})
+        source.__get__(None, SourceSpec)
+        source.__get__(None, SourceSpec)
+
+        assert registry.export() == ""
+
+    def test_callbacks(self, registry):
+        class SourceSpec:
+            pass
+
+        observations = []
+        registry.add_callback(lambda *observation: observations.append(observation))
+        source = MyValueSource("foo", {"foo": "bar"})
+        source.__get__(None, SourceSpec)
+        source.__get__(None, SourceSpec)
+
+        labels = {"source": "MyValueSource", "key": "MyValueSource"}
+        names = [name for name, _, _ in observations]
+        assert names == [FETCH_SECONDS, CACHE_MISSES, CACHE_HITS]
+        assert all(observed == labels for _, observed, _ in observations)
+
+
+class TestRegistry:
+    def test_prometheus_export(self):
+        registry = Registry(buckets=(0.1, 1.0))
+        labels = (("key", 'a"b'), ("source", "Parameter"))
+        registry.inc(CACHE_HITS, labels)
+        registry.inc(CACHE_HITS, labels)
+        registry.observe(FETCH_SECONDS, labels, 0.5)
+
+        assert registry.export() == "\n".join(
+            [
+                f"# HELP {CACHE_HITS} Reads served from a source cache.",
+                f"# TYPE {CACHE_HITS} counter",
+                f'{CACHE_HITS}{{key="a\\"b",source="Parameter"}} 2.0',
+                f"# HELP {FETCH_SECONDS} Duration of source backend fetches.",
+                f"# TYPE {FETCH_SECONDS} histogram",
+                f'{FETCH_SECONDS}_bucket{{key="a\\"b",source="Parameter",le="0.1"}} 0',
+                f'{FETCH_SECONDS}_bucket{{key="a\\"b",source="Parameter",le="1.0"}} 1',
+                f'{FETCH_SECONDS}_bucket{{key="a\\"b",source="Parameter",le="+Inf"}} 1',
+                f'{FETCH_SECONDS}_sum{{key="a\\"b",source="Parameter"}} 0.5',
+                f'{FETCH_SECONDS}_count{{key="a\\"b",source="Parameter"}} 1',
+                "",
+            ]
+        )
+
+    def test_failing_callback_is_ignored(self):
+        registry = Registry()
+
+        def callback(name, labels, value):
+            raise RuntimeError("broken")
+
+        registry.add_callback(callback)
+        registry.inc(CACHE_HITS, (("source", "Env"),))
+
+        assert registry.counter(CACHE_HITS, source="Env") == 1
@@ -0,0 +1,147 @@
+import gc
+import threading
+import time
+import weakref
+
+import pytest
+
+from config_composer.sources import refresh
+from config_composer.sources.abc import (
+    AbstractSourceDescriptor,
+    DocumentSource,
+    DocumentSourceTTL,
+)
+from config_composer.sources.refresh import RefreshScheduler
+from tests.unit.helpers import wait_for
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    scheduler = RefreshScheduler()
+    monkeypatch.setattr(refresh, "_scheduler", scheduler)
+    yield scheduler
+    scheduler.stop()
+
+
+class MySource(DocumentSource, DocumentSourceTTL, AbstractSourceDescriptor):
+    def __init__(self, ttl):
+        self._ttl = ttl
+        self.loads = []
+        self.fail = False
+
+    @property
+    def _name(self):
+        return "foo"
+
+    @property
+    def _key(self):
+        return (type(self).__name__,)
+
+    def __repr__(self):
+        return f"""MySource(ttl={self._ttl})"""
+
+    @property
+    def _doc(self):
+        if self.fail:
+            raise ConnectionError("backend down")
+        self.loads.append(threading.current_thread())
+        return {"foo": len(self.loads)}
+
+    def _expired(self, ttl_stamp):
+        now = time.monotonic()
+        if not isinstance(ttl_stamp, dict) or (now - ttl_stamp["read"]) > self._ttl:
+            return True, {"read": now}
+        return False, ttl_stamp
+
+
+class TestRefreshScheduler:
+    def test_refreshes_ahead_of_expiry(self, scheduler):
+        source = MySource(ttl=0.2)
+
+        class SourceSpec:
+            foo = source
+
+        scheduler.start()
+        assert SourceSpec.foo == 1
+
+        assert wait_for(lambda: len(source.loads) >= 3)
+        # reads never reload the document themselves
+        assert all(thread is scheduler._thread for thread in source.loads[1:])
+        assert SourceSpec.foo >= 3
+
+        metrics = scheduler.metrics()
+        assert metrics["refreshes"] >= 2
+        assert metrics["errors"] == 0
+        assert metrics["scheduled"] == 1
+        assert 0.0 <= metrics["last_lag"] <= metrics["max_lag"]
+
+    def test_serves_stale_values_while_refreshing(self, scheduler):
+        source = MySource(ttl=0.2)
+
+        class SourceSpec:
+            foo = source
+
+        scheduler.start()
+        assert SourceSpec.foo == 1
+        source.fail = True
+
+        assert wait_for(lambda: scheduler.metrics()["errors"] >= 2)
+        assert SourceSpec.foo == 1
+        assert len(source.loads) == 1
+
+    def test_reads_refresh_when_stopped(self, scheduler):
+        source = MySource(ttl=0.05)
+
+        class SourceSpec:
+            foo = source
+
+        assert SourceSpec.foo == 1
+        time.sleep(0.1)
+        assert SourceSpec.foo == 2
+        assert source.loads == [threading.current_thread()] * 2
+
+    def test_unstarted_scheduler_holds_no_references(self, scheduler):
+        source = MySource(ttl=0.2)
+        specs = [type("SourceSpec", (), {"foo": source}) for _ in range(10)]
+        for SourceSpec in specs:
+            assert SourceSpec.foo == len(source.loads)
+        spec_refs = [weakref.ref(SourceSpec) for SourceSpec in specs]
+
+        assert scheduler._queue == []
+        del specs, SourceSpec
+        gc.collect()
+
+        assert [ref() for ref in spec_refs] == [None] * 10
+        assert scheduler._registered == {}
+
+    def test_start_schedules_registered_sources(self, scheduler):
+        source = MySource(ttl=0.2)
+
+        class SourceSpec:
+            foo = source
+
+        assert SourceSpec.foo == 1
+        scheduler.start()
+
+        assert wait_for(lambda: len(source.loads) >= 2)
+        assert source.loads[1] is scheduler._thread
+
+    def test_drops_sources_of_collected_specs(self, scheduler):
+        source = MySource(ttl=0.2)
+        SourceSpec = type("SourceSpec", (), {"foo": source})
+        spec_ref = weakref.ref(SourceSpec)
+
+        scheduler.start()
+        assert SourceSpec.foo == 1
+        del SourceSpec
+        gc.collect()
+
+        assert spec_ref() is None
+        assert wait_for(lambda: scheduler.metrics()["scheduled"] == 0)
+        assert len(source.loads) == 1
+
+    def test_delays_are_jittered(self, scheduler):
+        delays = [scheduler._delay(100) for _ in range(100)]
+
+        assert all(80 <= delay <= 90 for delay in delays)
+        assert len(set(delays)) > 1
@@ -0,0 +1,375 @@
+import boto3.session
+import pytest
+from botocore.stub import Stubber
+
+from benchmarks.standins import VaultStandIn
+from config_composer.consts import NOTHING
+from config_composer.sources import aws, metrics, resilience, vault
+from config_composer.sources.abc import (
+    AbstractSourceDescriptor,
+    ValueSource,
+    DocumentSource,
+)
+from config_composer.sources.metrics import RATE_LIMIT_WAIT_SECONDS, Registry
+from config_composer.sources.resilience import (
+    CircuitBreaker,
+    Resilient,
+    SourceUnavailable,
+    TokenBucket,
+)
+from tests.unit.helpers import Clock
+
+
+class Transient(Exception):
+    pass
+
+
+class Backend:
+    """Fails with the errors queued, then answers with its values."""
+
+    def __init__(self, values, errors=()):
+        self.values = values
+        self.errors = list(errors)
+        self.calls = 0
+
+    def fetch(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return dict(self.values)
+
+
+class RemoteSource(Resilient):
+    def __init__(self, name, backend, **options):
+        self._path = name
+        self.backend = backend
+        self._set_resilience_options(**options)
+
+    @property
+    def _name(self):
+        return self._path
+
+    @property
+    def _backend_key(self):
+        return ("backend", id(self.backend))
+
+    def _transient(self, error):
+        return isinstance(error, Transient)
+
+
+class RemoteValue(RemoteSource, ValueSource, AbstractSourceDescriptor):
+    _negative_ttl = 30
+
+    @property
+    def _key(self):
+        return ("RemoteValue",)
+
+    def __repr__(self):
+        return f"""RemoteValue(path="{self._path}")"""
+
+    @property
+    def _value(self):
+        return self._call(self.backend.fetch).get(self._path, NOTHING)
+
+
+class RemoteDocument(RemoteSource, DocumentSource, AbstractSourceDescriptor):
+    _negative_ttl = 30
+
+    @property
+    def _key(self):
+        return ("RemoteDocument",)
+
+    def __repr__(self):
+        return f"""RemoteDocument(path="{self._path}")"""
+
+    @property
+    def _doc(self):
+        return self._call(self.backend.fetch)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(resilience, "_sleep", sleeps.append)
+    monkeypatch.setattr(resilience, "_breakers", {})
+    monkeypatch.setattr(resilience, "_buckets", {})
+    return sleeps
+
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=3, _get_time=Clock())
+        breaker.failure()
+        breaker.failure()
+        breaker.success()
+        breaker.failure()
+        breaker.failure()
+        assert breaker.allow()
+
+        breaker.failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow()
+
+    def test_single_trial_call_after_reset_timeout(self):
+        clock = Clock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, _get_time=clock)
+        breaker.failure()
+
+        clock.now += 30
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow()
+        assert not breaker.allow()
+
+        # A failed trial opens the circuit again
+        breaker.failure()
+        assert not breaker.allow()
+        clock.now += 30
+        assert breaker.allow()
+        breaker.success()
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.allow()
+
+
+class TestRetries:
+    def test_transient_errors_are_retried(self, sleeps):
+        backend = Backend({"foo": "bar"}, [Transient(), Transient()])
+        source = RemoteSource("foo", backend, retries=2)
+
+        assert source._call(backend.fetch) == {"foo": "bar"}
+        assert backend.calls == 3
+        assert len(sleeps) == 2
+        assert 0 <= sleeps[0] <= resilience.BASE_DELAY
+        assert 0 <= sleeps[1] <= 2 * resilience.BASE_DELAY
+
+    def test_gives_up_after_retries(self, sleeps):
+        backend = Backend({}, [Transient()] * 3)
+        source = RemoteSource("foo", backend, retries=1)
+
+        with pytest.raises(SourceUnavailable):
+            source._call(backend.fetch)
+        assert backend.calls == 2
+
+    def test_other_errors_are_raised(self, sleeps):
+        backend = Backend({}, [KeyError("foo")])
+        source = RemoteSource("foo", backend)
+
+        with pytest.raises(KeyError):
+            source._call(backend.fetch)
+        assert backend.calls == 1
+        assert resilience.get_breaker(source._backend_key).state == "closed"
+
+    def test_no_retry_past_the_deadline(self, sleeps):
+        backend = Backend({}, [Transient()] * 3)
+        source = RemoteSource("foo", backend, deadline=0)
+
+        with pytest.raises(SourceUnavailable):
+            source._call(backend.fetch)
+        assert backend.calls == 1
+        assert sleeps == []
+
+    def test_fails_fast_while_circuit_is_open(self, sleeps):
+        backend = Backend({}, [Transient()] * resilience.FAILURE_THRESHOLD)
+        source = RemoteSource("foo", backend, retries=10)
+
+        with pytest.raises(SourceUnavailable):
+            source._call(backend.fetch)
+        assert backend.calls == resilience.FAILURE_THRESHOLD
+
+        # Other sources of the backend fail fast too
+        with pytest.raises(SourceUnavailable):
+            RemoteSource("bar", backend)._call(backend.fetch)
+        assert backend.calls == resilience.FAILURE_THRESHOLD
+
+
+class TestRateLimit:
+    def test_calls_beyond_the_burst_are_queued(self):
+        clock = Clock()
+        bucket = TokenBucket(rate=10, burst=2, _get_time=clock)
+
+        waits = [bucket.reserve() for _ in range(4)]
+        assert waits == pytest.approx([0, 0, 0.1, 0.2])
+
+        clock.now += 0.5
+        assert bucket.reserve() == 0
+
+    def test_no_token_taken_past_max_wait(self):
+        clock = Clock()
+        bucket = TokenBucket(rate=10, burst=1, _get_time=clock)
+        bucket.reserve()
+
+        assert bucket.reserve(max_wait=0.05) is None
+        assert bucket.reserve(max_wait=0.1) == pytest.approx(0.1)
+
+    def test_backend_sources_share_the_lowest_limit(self, sleeps):
+        backend = Backend({"foo": "bar"})
+        fast = RemoteSource("foo", backend, rate_limit=100, burst=1)
+        slow = RemoteSource("bar", backend, rate_limit=10, burst=1)
+
+        fast._call(backend.fetch)
+        slow._call(backend.fetch)
+        fast._call(backend.fetch)
+
+        assert list(resilience._buckets) == [fast._backend_key]
+        # Queued at the slow source's rate, behind each other
+        assert sleeps == pytest.approx([0.1, 0.2], abs=0.01)
+
+    def test_rate_limited_past_the_deadline(self, sleeps):
+        backend = Backend({"foo": "bar"})
+        source = RemoteSource("foo", backend, rate_limit=1, burst=1, deadline=0.5)
+
+        source._call(backend.fetch)
+        with pytest.raises(SourceUnavailable):
+            source._call(backend.fetch)
+        assert backend.calls == 1
+
+    def test_queue_wait_metrics(self, sleeps, monkeypatch):
+        registry = Registry()
+        monkeypatch.setattr(metrics, "_registry", registry)
+        monkeypatch.setattr(metrics, "enabled", True)
+        backend = Backend({"foo": "bar", "baz": "qux"})
+
+        class SourceSpec:
+            foo = RemoteValue("foo", backend, rate_limit=10, burst=1)
+            baz = RemoteValue("baz", backend, rate_limit=10, burst=1)
+
+        assert SourceSpec.foo == "bar"
+        assert SourceSpec.baz == "qux"
+
+        labels = dict(key="RemoteValue", source="RemoteValue")
+        histogram = registry.histogram(RATE_LIMIT_WAIT_SECONDS, **labels)
+        assert histogram["count"] == 2
+        assert histogram["sum"] == pytest.approx(sum(sleeps))
+        assert histogram["sum"] > 0
+
+
+class TestUnavailableSources:
+    def test_value_source_serves_nothing(self, sleeps):
+        backend = Backend({"foo": "bar"}, [Transient()] * 3)
+
+        class SourceSpec:
+            foo = RemoteValue("foo", backend, retries=2)
+
+        assert SourceSpec.foo is NOTHING
+        # Not remembered as missing
+        assert SourceSpec.foo == "bar"
+
+    def test_document_source_serves_last_values(self, sleeps):
+        backend = Backend({"foo": "bar"})
+
+        class SourceSpec:
+            foo = RemoteDocument("foo", backend, retries=0)
+            missing = RemoteDocument("missing", backend, retries=0)
+
+        assert SourceSpec.foo == "bar"
+
+        backend.errors = [Transient()]
+        assert SourceSpec.missing is NOTHING
+        assert SourceSpec.foo == "bar"
+        assert "missing" not in SourceSpec.__source_missing__[("RemoteDocument",)]
+
+
+@pytest.fixture
+def stubbed_ssm(monkeypatch):
+    monkeypatch.setattr(aws, "_clients", {})
+    session = boto3.session.Session(
+        aws_access_key_id="testing",
+        aws_secret_access_key="testing",
+        region_name="us-east-1",
+    )
+    client = session.client("ssm")
+    stubber = Stubber(client)
+    # Passed as the session, to create the pooled client with
+    session_stub = type("Session", (), {"client": lambda self, *a, **kw: client})()
+    with stubber:
+        yield stubber, session_stub
+
+
+class TestAWSRetries:
+    def test_throttling_is_retried(self, sleeps, stubbed_ssm):
+        stubber, session = stubbed_ssm
+        stubber.add_client_error("get_parameters", "ThrottlingException", "", 400)
+        stubber.add_client_error("get_parameters", "InternalServerError", "", 500)
+        stubber.add_response(
+            "get_parameters", {"Parameters": [{"Name": "/foo", "Value": "bar"}]}
+        )
+
+        class SourceSpec:
+            foo = aws.Parameter(path="/foo", session=session)
+
+        assert SourceSpec.foo == "bar"
+        assert len(sleeps) == 2
+        stubber.assert_no_pending_responses()
+
+    def test_other_errors_are_not_retried(self, sleeps, stubbed_ssm):
+        stubber, session = stubbed_ssm
+        stubber.add_client_error("get_parameters", "AccessDeniedException", "", 400)
+
+        class SourceSpec:
+            foo = aws.Parameter(path="/foo", session=session)
+
+        assert SourceSpec.foo is NOTHING
+        assert sleeps == []
+
+    def test_parameters_share_a_rate_limit(self, sleeps, stubbed_ssm):
+        stubber, session = stubbed_ssm
+        for name in ("/foo", "/bar"):
+            stubber.add_response(
+                "get_parameters", {"Parameters": [{"Name": name, "Value": "x"}]}
+            )
+
+        class SourceSpec:
+            foo = aws.Parameter(path="/foo", session=session)
+
+        class OtherSourceSpec:
+            bar = aws.Parameter(path="/bar", session=session, rate_limit=10)
+
+        assert SourceSpec.foo == "x"
+        assert OtherSourceSpec.bar == "x"
+        (bucket,) = resilience._buckets.values()
+        assert bucket._rate == 10
+        assert bucket._burst == resilience.BURST
+
+    def test_clients_make_single_attempts(self, monkeypatch):
+        monkeypatch.setattr(aws, "_clients", {})
+        client = aws.get_client(region="us-east-1", timeout=2)
+
+        assert client.meta.config.read_timeout == 2
+        assert client.meta.config.connect_timeout == 2
+        assert client.meta.config.retries["total_max_attempts"] == 1
+
+
+@pytest.fixture
+def vault_standin(monkeypatch):
+    monkeypatch.setattr(vault, "_clients", {})
+    monkeypatch.setattr(vault, "_kv_versions", {})
+    with VaultStandIn({"db": {"password": "hunter2"}}) as standin:
+        yield standin
+
+
+class TestVaultRetries:
+    def test_server_errors_are_retried(self, sleeps, vault_standin):
+        vault_standin.fail(2)
+        field = vault.Secret(path="db", field="password", server=vault_standin.url)
+
+        class SourceSpec:
+            password = field
+
+        assert SourceSpec.password == "hunter2"
+        assert vault_standin.requests == 4
+        assert len(sleeps) == 2
+
+    def test_times_out(self, sleeps, vault_standin):
+        vault_standin.latency = 0.5
+        field = vault.Secret(
+            path="db",
+            field="password",
+            server=vault_standin.url,
+            timeout=0.05,
+            retries=1,
+        )
+
+        class SourceSpec:
+            password = field
+
+        assert SourceSpec.password is NOTHING
+        assert len(sleeps) == 1
@@ -1,5 +1,18 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import pytest
+
 from config_composer.sources import vault
 from config_composer.consts import NOTHING
+from tests.unit.helpers import wait_for
+
+
+@pytest.fixture
+def vault_pool(monkeypatch):
+    monkeypatch.setattr(vault, "_clients", {})
+    monkeypatch.setattr(vault, "_kv_versions", {})
 
 
 class TestVaultSecret:
@@ -26,3 +39,176 @@ class TestVaultSecret:
         field = vault.Secret(path="/im/not/here", field="not-here")
 
         self.assert_descriptor_value(field, NOTHING)
+
+    def test_reuses_client_and_mount_version(
+        self, vault_secret_fixtures, vault_pool, requests_mock
+    ):
+        random_string = vault_secret_fixtures
+
+        for _ in range(5):
+            field = vault.Secret(path="/foo/bar/baz", field="my-secret")
+            self.assert_descriptor_value(field, random_string)
+
+        paths = [request.path for request in requests_mock.request_history]
+        assert paths.count("/v1/sys/mounts") == 1
+        assert paths.count("/v1/secret/data/foo/bar/baz") == 5
+        assert list(vault._clients) == [("http://localhost:8200", vault.TIMEOUT)]
+
+    def test_mount_version_ttl(self, vault_secret_fixtures, vault_pool, requests_mock):
+        client = vault.get_client("http://localhost:8200")
+
+        for _ in range(3):
+            version = vault.get_kv_version(
+                client, "http://localhost:8200", "secret", ttl=0
+            )
+            assert version == "2"
+
+        paths = [request.path for request in requests_mock.request_history]
+        assert paths.count("/v1/sys/mounts") == 3
+
+    def test_reads_path_once_for_all_fields(
+        self, vault_secret_fixtures, vault_pool, requests_mock
+    ):
+        requests_mock.get(
+            url="http://localhost:8200/v1/secret/data/db",
+            json={
+                "data": {
+                    "data": {"username": "bob", "password": "hunter2"},
+                    "metadata": {"version": 1},
+                }
+            },
+        )
+
+        class SourceSpec:
+            username = vault.Secret(path="db", field="username")
+            password = vault.Secret(path="db", field="password")
+            host = vault.Secret(path="db", field="host")
+
+        assert SourceSpec.username == "bob"
+        assert SourceSpec.password == "hunter2"
+
+        paths = [request.path for request in requests_mock.request_history]
+        assert paths.count("/v1/secret/data/db") == 1
+
+    def test_coalesces_concurrent_reads(
+        self, vault_secret_fixtures, vault_pool, requests_mock
+    ):
+        def slow_secret(request, context):
+            time.sleep(0.1)
+            return {"data": {"data": {"a": "1", "b": "2"}, "metadata": {}}}
+
+        requests_mock.get(
+            url="http://localhost:8200/v1/secret/data/slow", json=slow_secret
+        )
+        fields = ["a", "b"] * 8
+
+        class SourceSpec:
+            pass
+
+        barrier = threading.Barrier(len(fields))
+
+        def read(field):
+            barrier.wait()
+            return vault.Secret(path="slow", field=field).__get__(None, SourceSpec)
+
+        with ThreadPoolExecutor(max_workers=len(fields)) as executor:
+            values = list(executor.map(read, fields))
+
+        assert values == ["1", "2"] * 8
+        paths = [request.path for request in requests_mock.request_history]
+        assert paths.count("/v1/secret/data/slow") == 1
+
+
+class TestVaultSecretRefresh:
+    secret_uri = "http://localhost:8200/v1/secret/data/rotating"
+
+    def secret(self, value, lease_duration=0):
+        return {
+            "lease_duration": lease_duration,
+            "data": {"data": {"password": value}, "metadata": {"version": 1}},
+        }
+
+    def test_refreshes_in_background_after_ttl(
+        self, vault_secret_fixtures, vault_pool, requests_mock
+    ):
+        control = {"time": 0.0}
+        requests_mock.get(url=self.secret_uri, json=self.secret("one"))
+
+        class SourceSpec:
+            password = vault.Secret(
+                path="rotating",
+                field="password",
+                ttl=10,
+                _get_time=lambda: control["time"],
+            )
+
+        assert SourceSpec.password == "one"
+
+        requests_mock.get(url=self.secret_uri, json=self.secret("two"))
+
+        # ttl has not expired and hence cache is used
+        control["time"] = 5.0
+        assert SourceSpec.password == "one"
+
+        # refreshed ahead of expiry, the last value is served meanwhile
+        control["time"] = 8.0
+        assert SourceSpec.password in ("one", "two")
+        assert wait_for(lambda: SourceSpec.password == "two")
+
+    def test_uses_lease_duration(
+        self, vault_secret_fixtures, vault_pool, requests_mock
+    ):
+        control = {"time": 0.0}
+        requests_mock.get(url=self.secret_uri, json=self.secret("one", 100))
+
+        class SourceSpec:
+            password = vault.Secret(
+                path="rotating", field="password", _get_time=lambda: control["time"]
+            )
+
+        assert SourceSpec.password == "one"
+
+        requests_mock.get(url=self.secret_uri, json=self.secret("two", 100))
+
+        control["time"] = 50.0
+        assert SourceSpec.password == "one"
+
+        control["time"] = 80.0
+        SourceSpec.password
+        assert wait_for(lambda: SourceSpec.password == "two")
+
+    def test_keeps_last_value_when_refresh_fails(
+        self, vault_secret_fixtures, vault_pool, requests_mock, monkeypatch
+    ):
+        threads = []
+        background_refresh = vault.Secret._background_refresh
+
+        def recorded_refresh(self, obj, objtype):
+            thread = background_refresh(self, obj, objtype)
+            threads.append(thread)
+            return thread
+
+        monkeypatch.setattr(vault.Secret, "_background_refresh", recorded_refresh)
+        control = {"time": 0.0}
+        requests_mock.get(url=self.secret_uri, json=self.secret("one"))
+
+        class SourceSpec:
+            password = vault.Secret(
+                path="rotating",
+                field="password",
+                ttl=10,
+                _get_time=lambda: control["time"],
+            )
+
+        assert SourceSpec.password == "one"
+
+        requests_mock.get(url=self.secret_uri, status_code=500)
+        control["time"] = 20.0
+        SourceSpec.password
+
+        # Joined while requests are mocked, so no retry reaches the network
+        (thread,) = threads
+        thread.join()
+        assert requests_mock.call_count >= 3
+        assert SourceSpec.password == "one"
+        assert threads == [thread]
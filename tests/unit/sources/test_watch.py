@@ -0,0 +1,56 @@
+from tempfile import TemporaryDirectory
+import os
+import sys
+import threading
+
+import pytest
+
+from config_composer.sources.watch import InotifyBackend, PollingBackend, Watcher
+from tests.unit.helpers import wait_for
+
+backends = [lambda: PollingBackend(interval=0.02)]
+if sys.platform.startswith("linux"):
+    backends.append(lambda: InotifyBackend(timeout=0.02))
+
+
+@pytest.fixture(params=backends, ids=["polling", "inotify"][: len(backends)])
+def watcher(request):
+    watcher = Watcher(backend=request.param())
+    yield watcher
+    watcher.stop()
+
+
+class TestWatcher:
+    def test_sees_writes(self, watcher):
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, ".env")
+            other = os.path.join(directory, ".other")
+            with open(path, "w") as fh:
+                fh.write("FOO=1\n")
+
+            changed = []
+            watcher.watch(path, changed.append)
+
+            with open(other, "w") as fh:
+                fh.write("FOO=1\n")
+            with open(path, "w") as fh:
+                fh.write("FOO=22\n")
+
+            assert wait_for(lambda: path in changed)
+            assert other not in changed
+
+    def test_sees_atomic_replace(self, watcher):
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, ".env")
+            with open(path, "w") as fh:
+                fh.write("FOO=1\n")
+
+            changed = threading.Event()
+            watcher.watch(path, lambda path: changed.set())
+
+            replacement = os.path.join(directory, ".env.tmp")
+            with open(replacement, "w") as fh:
+                fh.write("FOO=22\n")
+            os.replace(replacement, path)
+
+            assert changed.wait(2.0)